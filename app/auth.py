@@ -1,9 +1,17 @@
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 from functools import lru_cache
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from app.lru import LRUCache
 
 # =========================================================
 # JWT Configuration
@@ -12,10 +20,32 @@ SECRET_KEY = "smartinventorysupersecretkey"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
+# =========================================================
+# Verified Token Cache
+# =========================================================
+# Decoded payloads keyed by SHA-256 of the bearer token; an entry never
+# outlives the token's own `exp`.
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "300"))
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+token_cache = LRUCache(TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL)
+
 # =========================================================
 # Password Hashing Configuration
 # =========================================================
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Changing BCRYPT_ROUNDS rehashes each password at its next successful login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+# Worker processes for bcrypt, and how many logins may be in flight before
+# new ones are turned away with 429
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 2)))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", str(PASSWORD_HASH_WORKERS * 4)))
 
 # OAuth2 Configuration (for Swagger UI)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
@@ -31,6 +61,8 @@ raw_users = {
 # =========================================================
 # Lazy Password Hashing (fixes bcrypt multiprocessing bug)
 # =========================================================
+# Hashed once per worker by the FastAPI lifespan (PasswordHashPool.warm_up),
+# never at import time.
 @lru_cache()
 def get_fake_users_db():
     """Hash passwords lazily when first accessed."""
@@ -51,15 +83,83 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
-def authenticate_user(username: str, password: str):
-    """Validate username and password."""
+def _verify_and_update(plain_password: str, hashed_password: str):
+    """Runs in a hashing worker: (valid, new hash if the cost changed else None)."""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+async def authenticate_user(username: str, password: str):
+    """Validate username and password, upgrading the stored hash if needed."""
     users = get_fake_users_db()
     user = users.get(username)
-    if not user or not verify_password(password, user["hashed_password"]):
+    if not user:
+        return None
+
+    valid, new_hash = await password_hash_pool.verify_and_update(password, user["hashed_password"])
+    if not valid:
         return None
+    if new_hash:
+        user["hashed_password"] = new_hash
     return user
 
 
+# =========================================================
+# Password Hashing Pool
+# =========================================================
+class PasswordHashPool:
+    """
+    Runs bcrypt in worker processes so a burst of logins never occupies the
+    request threadpool or the GIL. At most `max_pending` verifications may be
+    queued or running; beyond that a login fails fast with 429 instead of
+    waiting behind the backlog.
+    """
+
+    def __init__(self, workers=PASSWORD_HASH_WORKERS, max_pending=PASSWORD_HASH_MAX_PENDING):
+        self.workers = workers
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+
+    def start(self):
+        # spawn, not fork: the worker already runs background threads
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        return self
+
+    def stop(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    async def _run(self, fn, *args):
+        if self._executor is None:
+            # Pool not started (scripts, tests): hash on the threadpool instead
+            return await asyncio.to_thread(fn, *args)
+        return await asyncio.wrap_future(self._executor.submit(fn, *args))
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str):
+        if not self._slots.acquire(blocking=False):
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many login attempts in progress, retry shortly",
+                headers={"Retry-After": "1"},
+            )
+        try:
+            return await self._run(_verify_and_update, plain_password, hashed_password)
+        finally:
+            self._slots.release()
+
+    async def warm_up(self):
+        """Start every worker process and hash the demo users before the first login."""
+        if self._executor is not None:
+            await asyncio.gather(*(self._run(os.getpid) for _ in range(self.workers)))
+        await asyncio.to_thread(get_fake_users_db)
+
+
+password_hash_pool = PasswordHashPool()
+
+
 def create_access_token(data: dict):
     """Generate JWT token."""
     to_encode = data.copy()
@@ -69,25 +169,44 @@ def create_access_token(data: dict):
 
 
 def verify_token(token: str = Depends(oauth2_scheme)):
-    """Decode and verify JWT token."""
+    """Decode and verify JWT token, reusing the result for repeat tokens."""
+    key = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(key)
+    if payload is not None:
+        return payload
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired token",
         )
 
+    ttl = TOKEN_CACHE_TTL
+    if "exp" in payload:
+        ttl = min(ttl, payload["exp"] - time.time())
+    if ttl > 0:
+        token_cache.set(key, payload, ttl=ttl)
+    return payload
+
+
+@lru_cache()
+def _role_checker(roles: tuple):
+    """One dependency per distinct role tuple, with its allowed set built once."""
+    allowed = frozenset(roles)
+    detail = f"Access denied. Allowed roles: {roles}"
 
-def require_role(*roles):
-    """Restrict route access to specific roles."""
     def role_checker(payload: dict = Depends(verify_token)):
-        user_role = payload.get("role")
-        if user_role not in roles:
+        if payload.get("role") not in allowed:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
-                detail=f"Access denied. Allowed roles: {roles}",
+                detail=detail,
             )
         return payload
     return role_checker
+
+
+def require_role(*roles):
+    """Restrict route access to specific roles."""
+    return _role_checker(roles)
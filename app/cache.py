@@ -0,0 +1,121 @@
+import os
+import threading
+from fastapi import Request, Response
+from app.etag import etag_matches, not_modified
+from app.lru import LRUCache
+from app.pagination import NEXT_CURSOR_HEADER, page_rows, paginate
+from app.responses import dump_record
+
+# =========================================================
+# Catalog Cache Configuration
+# =========================================================
+CACHE_ENABLED = os.getenv("CATALOG_CACHE_ENABLED", "true").lower() == "true"
+CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "60"))
+CACHE_MAX_PAGES = int(os.getenv("CATALOG_CACHE_MAX_PAGES", "1024"))
+CACHE_MAX_RECORDS = int(os.getenv("CATALOG_CACHE_MAX_RECORDS", "10000"))
+
+
+class CatalogCache:
+    """
+    Pre-serialized list pages and records for the reference tables
+    (products, suppliers, warehouses).
+
+    Every key carries the table's generation number, so invalidating a table
+    is one counter bump: older entries become unreachable and age out of the
+    LRU. A fill that raced with a write lands under the old generation and is
+    never served.
+    """
+
+    def __init__(self, max_pages=CACHE_MAX_PAGES, max_records=CACHE_MAX_RECORDS, ttl=CACHE_TTL):
+        self.pages = LRUCache(max_pages, ttl)
+        self.records = LRUCache(max_records, ttl)
+        self._generations = {}
+        self._lock = threading.Lock()
+        self._listeners = []
+
+    def generation(self, table: str) -> int:
+        return self._generations.get(table, 0)
+
+    def _bump(self, table: str):
+        with self._lock:
+            self._generations[table] = self._generations.get(table, 0) + 1
+
+    def invalidate(self, table: str):
+        """Drop cached data for `table` after a write and tell other workers."""
+        self._bump(table)
+        for listener in self._listeners:
+            listener(table)
+
+    def apply_remote_invalidation(self, table: str):
+        """Invalidate on behalf of another worker, without re-broadcasting."""
+        self._bump(table)
+
+    def add_invalidation_listener(self, listener):
+        """
+        Register `listener(table)` to run on every local invalidation, e.g. to
+        publish it to other workers, which call apply_remote_invalidation.
+        """
+        self._listeners.append(listener)
+
+    def stats(self) -> dict:
+        return {"enabled": CACHE_ENABLED, "pages": self.pages.stats(), "records": self.records.stats()}
+
+
+catalog_cache = CatalogCache()
+
+
+# Validators set by not_modified() that are cached alongside the body
+VALIDATOR_HEADERS = ("ETag", "Last-Modified")
+
+
+def _json_response(body: bytes, cursor=None, validators=None) -> Response:
+    headers = {NEXT_CURSOR_HEADER: cursor} if cursor else {}
+    headers.update(validators or {})
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def cached_page(table, db, model, pk_column, schema, page, request: Request, response: Response):
+    """
+    Conditional, paginated listing through the catalog cache.
+
+    The ETag / Last-Modified of the version that filled an entry are cached
+    with its body, so a hit (including a 304) costs no query at all. NDJSON
+    streams are never cached and carry no validators.
+    """
+    if page.stream:
+        return paginate(db, model, pk_column, schema, page, response)
+    if not CACHE_ENABLED:
+        return not_modified(request, response, db, table) or paginate(db, model, pk_column, schema, page, response)
+
+    key = (table, catalog_cache.generation(table), page.limit, page.after)
+    entry = catalog_cache.pages.get(key)
+    if entry is None:
+        unchanged = not_modified(request, response, db, table)
+        if unchanged is not None:
+            return unchanged
+        rows = page_rows(db, model, pk_column, page, response)
+        records = [dump_record(row, schema) for row in rows]
+        validators = {h: response.headers[h] for h in VALIDATOR_HEADERS if h in response.headers}
+        entry = (b"[" + b",".join(records) + b"]", response.headers.get(NEXT_CURSOR_HEADER), validators)
+        catalog_cache.pages.set(key, entry)
+        for row, record in zip(rows, records):
+            catalog_cache.records.set((table, key[1], getattr(row, pk_column.key)), record)
+
+    body, cursor, validators = entry
+    if "ETag" in validators and etag_matches(request, validators["ETag"]):
+        return Response(status_code=304, headers=validators)
+    return _json_response(body, cursor, validators)
+
+
+def cached_record(table, db, model, pk_column, schema, record_id):
+    """Serialized record by primary key through the catalog cache, or None if missing."""
+    key = (table, catalog_cache.generation(table), record_id)
+    body = catalog_cache.records.get(key) if CACHE_ENABLED else None
+    if body is None:
+        row = db.query(model).filter(pk_column == record_id).first()
+        if row is None:
+            return None
+        body = dump_record(row, schema)
+        if CACHE_ENABLED:
+            catalog_cache.records.set(key, body)
+    return _json_response(body)
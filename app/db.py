@@ -1,7 +1,17 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import QueuePool
+from fastapi import Depends, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from dotenv import load_dotenv
+from app.pool_metrics import PoolMetrics, instrumented_pool
+import inspect
+import itertools
+import math
 import os
+import ssl
+import time
 
 load_dotenv()
 
@@ -10,22 +20,288 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("❌ DATABASE_URL not loaded. Check your .env file!")
 
-# Azure MySQL SSL fix — must pass ssl argument
-connect_args = {"ssl": {"ssl-mode": "REQUIRED"}}
+# "sync" (default) or "async" to serve routes from an async engine
+DATABASE_MODE = os.getenv("DATABASE_MODE", "sync")
+ASYNC_MODE = DATABASE_MODE == "async"
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args=connect_args,
-    pool_pre_ping=True
-)
+# Optional comma-separated read replicas for read-only routes
+REPLICA_URLS = [u.strip() for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u.strip()]
+# After a write, the same client reads from the primary for this long
+READ_YOUR_WRITES_SECONDS = float(os.getenv("DB_READ_YOUR_WRITES_SECONDS", "5"))
+READ_PRIMARY_COOKIE = "read_primary_until"
+READ_CONSISTENCY_HEADER = "X-Read-Consistency"
+
+# =========================================================
+# Connection Pool Configuration
+# =========================================================
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "-1"))
+# "always" pings on every checkout, "idle" only pings connections idle for
+# longer than DB_POOL_PING_IDLE_SECONDS, "never" relies on pool_recycle
+POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "always").strip().lower()
+POOL_PRE_PING_MODES = ("always", "idle", "never")
+if POOL_PRE_PING not in POOL_PRE_PING_MODES:
+    raise ValueError(
+        f"❌ DB_POOL_PRE_PING must be one of {', '.join(POOL_PRE_PING_MODES)}, got {os.getenv('DB_POOL_PRE_PING')!r}"
+    )
+POOL_PING_IDLE_SECONDS = float(os.getenv("DB_POOL_PING_IDLE_SECONDS", "30"))
+
+
+def _connect_args(url, async_driver=False):
+    if url.get_backend_name() == "mysql":
+        # Azure MySQL SSL fix — must pass ssl argument
+        return {"ssl": ssl.create_default_context()} if async_driver else {"ssl": {"ssl-mode": "REQUIRED"}}
+    if url.get_backend_name() == "sqlite" and not async_driver:
+        return {"check_same_thread": False}
+    return {}
+
+
+def _pool_args(url, base_pool, metrics):
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return {}  # in-memory SQLite keeps its single-connection pool
+    return {
+        "poolclass": instrumented_pool(base_pool, metrics),
+        "pool_size": POOL_SIZE,
+        "max_overflow": MAX_OVERFLOW,
+        "pool_timeout": POOL_TIMEOUT,
+        "pool_recycle": POOL_RECYCLE,
+        "pool_pre_ping": POOL_PRE_PING == "always",
+    }
+
+
+def _ping_idle_connections(engine):
+    """Ping on checkout only when the connection sat idle long enough to have been dropped."""
+    @event.listens_for(engine, "checkin")
+    def _mark_idle(dbapi_connection, record):
+        record.info["idle_since"] = time.monotonic()
+
+    @event.listens_for(engine, "checkout")
+    def _ping(dbapi_connection, record, proxy):
+        idle_since = record.info.get("idle_since")
+        if idle_since is None or time.monotonic() - idle_since < POOL_PING_IDLE_SECONDS:
+            return
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute("SELECT 1")
+        except Exception:
+            # The pool discards this connection and retries with a fresh one
+            raise exc.DisconnectionError()
+        finally:
+            cursor.close()
+
+
+# Statements that only read; anything else starts the write transaction
+SQLITE_READ_STATEMENTS = ("SELECT", "PRAGMA", "EXPLAIN")
+
+
+def _sqlite_write_locks(engine):
+    """
+    Make SELECT ... FOR UPDATE hold on SQLite. SQLite has no row locks and
+    the driver only opens a transaction at the first INSERT/UPDATE/DELETE,
+    so a locking read ran outside any transaction and two reservations
+    could both pass the stock check. Instead the first write or locking
+    read of a transaction issues BEGIN IMMEDIATE, taking the database write
+    lock until commit; plain reads still run outside a transaction.
+    """
+    @event.listens_for(engine, "connect")
+    def _manual_begin(dbapi_connection, record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _defer_begin(conn):
+        conn.info["sqlite_begin_pending"] = True
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _begin_before_write(conn, cursor, statement, parameters, context, executemany):
+        if not conn.info.get("sqlite_begin_pending"):
+            return
+        compiled = getattr(context, "compiled", None)
+        locking = getattr(getattr(compiled, "statement", None), "_for_update_arg", None) is not None
+        if locking or not statement.lstrip().upper().startswith(SQLITE_READ_STATEMENTS):
+            conn.info["sqlite_begin_pending"] = False
+            cursor.execute("BEGIN IMMEDIATE")
+
+
+def _configure_engine(engine, metrics):
+    metrics.attach(engine)
+    if engine.dialect.name == "sqlite":
+        _sqlite_write_locks(engine)
+    if POOL_PRE_PING == "idle":
+        _ping_idle_connections(engine)
+    return engine
+
+
+def _make_engine(url, name):
+    url = make_url(url)
+    metrics = PoolMetrics(name)
+    return _configure_engine(
+        create_engine(url, connect_args=_connect_args(url), **_pool_args(url, QueuePool, metrics)),
+        metrics,
+    )
+
+
+engine = _make_engine(DATABASE_URL, "primary")
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+replica_engines = [_make_engine(url, f"replica-{i}") for i, url in enumerate(REPLICA_URLS)]
+ReplicaSessions = [sessionmaker(autocommit=False, autoflush=False, bind=e) for e in replica_engines]
+
 Base = declarative_base()
 
-def get_db():
+
+# =========================================================
+# Read-Your-Writes Routing
+# =========================================================
+def mark_write(response: Response):
+    """Pin this client's reads to the primary for READ_YOUR_WRITES_SECONDS."""
+    if REPLICA_URLS:
+        response.set_cookie(
+            READ_PRIMARY_COOKIE,
+            str(time.time() + READ_YOUR_WRITES_SECONDS),
+            max_age=math.ceil(READ_YOUR_WRITES_SECONDS),
+            httponly=True,
+        )
+
+
+def reads_from_primary(request: Request) -> bool:
+    """True if the client asked for primary reads or wrote very recently."""
+    if request.headers.get(READ_CONSISTENCY_HEADER, "").lower() == "primary":
+        return True
+    try:
+        return float(request.cookies.get(READ_PRIMARY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def _pick(primary, replicas, cycle, request):
+    if not replicas or reads_from_primary(request):
+        return primary
+    return replicas[next(cycle)]
+
+
+_replica_cycle = itertools.cycle(range(len(ReplicaSessions)))
+
+
+def get_db(response: Response):
+    mark_write(response)
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+def get_read_db(request: Request):
+    """Session for read-only routes, spread round-robin over the replicas."""
+    db = _pick(SessionLocal, ReplicaSessions, _replica_cycle, request)()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# =========================================================
+# Async Mode (DATABASE_MODE=async)
+# =========================================================
+# Async driver per sync driver; override with ASYNC_DATABASE_URL
+ASYNC_DRIVERS = {
+    "mysql": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+
+def _async_url(url):
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.drivername, url.drivername))
+
+
+async_engine = None
+AsyncSessionLocal = None
+AsyncReplicaSessions = []
+
+if ASYNC_MODE:
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+    def _make_async_engine(url, name):
+        url = make_url(url)
+        metrics = PoolMetrics(name)
+        new_engine = create_async_engine(
+            url,
+            connect_args=_connect_args(url, async_driver=True),
+            **_pool_args(url, AsyncAdaptedQueuePool, metrics),
+        )
+        _configure_engine(new_engine.sync_engine, metrics)
+        return new_engine
+
+    async_engine = _make_async_engine(os.getenv("ASYNC_DATABASE_URL") or _async_url(DATABASE_URL), "async")
+    AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False)
+    AsyncReplicaSessions = [
+        async_sessionmaker(_make_async_engine(_async_url(url), f"async-replica-{i}"), class_=AsyncSession, autoflush=False)
+        for i, url in enumerate(REPLICA_URLS)
+    ]
+
+_async_replica_cycle = itertools.cycle(range(len(AsyncReplicaSessions)))
+
+
+async def get_async_db(response: Response):
+    mark_write(response)
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_read_db(request: Request):
+    async with _pick(AsyncSessionLocal, AsyncReplicaSessions, _async_replica_cycle, request)() as db:
+        yield db
+
+
+# Sync dependency -> async counterpart used by db_route
+ASYNC_DEPENDENCIES = {get_db: get_async_db, get_read_db: get_async_read_db}
+
+
+def db_route(func):
+    """
+    Let a route written against a sync `db: Session` run on the async engine.
+
+    In sync mode the route is returned unchanged. In async mode its `db`
+    dependency becomes the async counterpart (get_async_db or
+    get_async_read_db) and a sync route body runs through
+    AsyncSession.run_sync, so it waits on the database without holding a
+    threadpool thread. Async routes get the AsyncSession itself and should
+    use run_db for their database work.
+    """
+    if not ASYNC_MODE:
+        return func
+
+    signature = inspect.signature(func)
+    parameters = [
+        p.replace(default=Depends(ASYNC_DEPENDENCIES[p.default.dependency])) if p.name == "db" else p
+        for p in signature.parameters.values()
+    ]
+
+    if inspect.iscoroutinefunction(func):
+        async def endpoint(*args, **kwargs):
+            return await func(*args, **kwargs)
+    else:
+        async def endpoint(*args, db, **kwargs):
+            return await db.run_sync(lambda session: func(*args, db=session, **kwargs))
+
+    # Not functools.wraps: FastAPI follows __wrapped__ and would see a sync route
+    endpoint.__name__ = func.__name__
+    endpoint.__qualname__ = func.__qualname__
+    endpoint.__doc__ = func.__doc__
+    endpoint.__module__ = func.__module__
+    endpoint.__signature__ = signature.replace(parameters=parameters)
+    return endpoint
+
+
+async def run_db(db, fn, *args):
+    """Call fn(session, *args) from an async route, for either session type."""
+    if ASYNC_MODE:
+        return await db.run_sync(fn, *args)
+    return await run_in_threadpool(fn, db, *args)
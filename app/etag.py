@@ -0,0 +1,58 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from fastapi import Request, Response
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+from app import models
+
+versions_table = models.TableVersion.__table__
+
+
+def bump_table_version(db: Session, *tables):
+    """
+    Advance the version of `tables` inside the caller's transaction.
+
+    Call it as the last statement before commit: the version row stays
+    locked only until the commit, and is always the last lock taken.
+    """
+    now = datetime.utcnow()
+    for table in sorted(tables):
+        result = db.execute(
+            update(versions_table)
+            .where(versions_table.c.table_name == table)
+            .values(version=versions_table.c.version + 1, updated_at=now)
+        )
+        if result.rowcount == 0:
+            db.execute(insert(versions_table).values(table_name=table, version=1, updated_at=now))
+
+
+def table_version(db: Session, table: str):
+    """(version, updated_at) of `table`; (0, None) before its first write."""
+    row = db.execute(
+        select(versions_table.c.version, versions_table.c.updated_at)
+        .where(versions_table.c.table_name == table)
+    ).first()
+    return (row.version, row.updated_at) if row else (0, None)
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match", "")
+    return if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]
+
+
+def not_modified(request: Request, response: Response, db: Session, table: str):
+    """
+    Set a strong ETag and Last-Modified for a listing of `table` from its
+    version row. Returns a 304 response when If-None-Match already matches,
+    so the caller can skip the query and serialization entirely.
+    """
+    version, updated_at = table_version(db, table)
+
+    headers = {"ETag": f'"{table}-{version}"'}
+    if updated_at is not None:
+        headers["Last-Modified"] = format_datetime(updated_at.replace(tzinfo=timezone.utc), usegmt=True)
+
+    if etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
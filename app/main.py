@@ -13,11 +13,38 @@
 # @app.get("/")
 # def root():
 #     return {"message": "Smart Inventory & Order Management API is running 🚀"}
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from app.routes import suppliers, products, warehouses, inventory, orders
-from app.routes import auth_router
+from app.routes import auth_router, metrics
+from app.services import service_bus, outbox, stock_summary
+from app.auth import password_hash_pool
+from app import request_metrics
 
-app = FastAPI(title="Smart Inventory & Order Management API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One Service Bus connection for the life of the worker
+    service_bus.start_publisher()
+    outbox.start_relay()
+    stock_summary.start_reconciler()
+    request_metrics.start_exporter()
+    # bcrypt workers up and demo hashes computed before the first login
+    await password_hash_pool.start().warm_up()
+    yield
+    await run_in_threadpool(request_metrics.stop_exporter)
+    await run_in_threadpool(password_hash_pool.stop)
+    await run_in_threadpool(stock_summary.stop_reconciler)
+    await run_in_threadpool(outbox.stop_relay)
+    await run_in_threadpool(service_bus.stop_publisher)
+
+
+app = FastAPI(title="Smart Inventory & Order Management API", lifespan=lifespan)
+
+# Per-route request counts and latency histograms, served at /metrics
+if request_metrics.REQUEST_METRICS_ENABLED:
+    app.add_middleware(request_metrics.RequestMetricsMiddleware)
 
 # Include routers
 app.include_router(auth_router.router)       # ✅ JWT Authentication routes
@@ -26,6 +53,7 @@ app.include_router(products.router)
 app.include_router(warehouses.router)
 app.include_router(inventory.router)
 app.include_router(orders.router)
+app.include_router(metrics.router)
 
 
 @app.get("/")
@@ -0,0 +1,71 @@
+"""
+Merge duplicate inventory rows and add the (product_id, warehouse_id) indexes.
+
+Run once against an existing database before deploying the new models:
+
+    python -m app.migrations.inventory_unique_pair
+
+Duplicate rows for the same product/warehouse pair are folded into the row
+with the lowest inventory_id (quantities summed, latest last_updated kept),
+then the unique and covering indexes declared on models.Inventory are created.
+The script is idempotent and safe to re-run.
+"""
+from sqlalchemy import func, inspect, select
+from app.db import engine
+from app import models
+
+
+def merge_duplicates(conn) -> int:
+    """Fold duplicate (product_id, warehouse_id) rows into one. Returns rows removed."""
+    inv = models.Inventory.__table__
+    groups = conn.execute(
+        select(
+            inv.c.product_id,
+            inv.c.warehouse_id,
+            func.min(inv.c.inventory_id).label("keep_id"),
+            func.sum(func.coalesce(inv.c.quantity, 0)).label("quantity"),
+            func.max(inv.c.last_updated).label("last_updated"),
+            func.count().label("row_count"),
+        )
+        .group_by(inv.c.product_id, inv.c.warehouse_id)
+        .having(func.count() > 1)
+    ).all()
+
+    removed = 0
+    for g in groups:
+        conn.execute(
+            inv.update()
+            .where(inv.c.inventory_id == g.keep_id)
+            .values(quantity=g.quantity, last_updated=g.last_updated)
+        )
+        conn.execute(
+            inv.delete().where(
+                inv.c.product_id == g.product_id,
+                inv.c.warehouse_id == g.warehouse_id,
+                inv.c.inventory_id != g.keep_id,
+            )
+        )
+        removed += g.row_count - 1
+    return removed
+
+
+def create_indexes(conn) -> list:
+    """Create any index declared on models.Inventory that the database lacks."""
+    existing = {ix["name"] for ix in inspect(conn).get_indexes(models.Inventory.__tablename__)}
+    created = []
+    for index in models.Inventory.__table__.indexes:
+        if index.name not in existing:
+            index.create(conn)
+            created.append(index.name)
+    return created
+
+
+def run():
+    with engine.begin() as conn:
+        removed = merge_duplicates(conn)
+        created = create_indexes(conn)
+    print(f"✅ Merged {removed} duplicate inventory rows; created indexes: {created or 'none'}")
+
+
+if __name__ == "__main__":
+    run()
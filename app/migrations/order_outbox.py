@@ -0,0 +1,18 @@
+"""
+Create the order_outbox table used by the transactional outbox relay.
+
+    python -m app.migrations.order_outbox
+
+Idempotent: does nothing if the table already exists.
+"""
+from app.db import engine
+from app import models
+
+
+def run():
+    models.OrderOutbox.__table__.create(engine, checkfirst=True)
+    print("✅ order_outbox table ready")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,26 @@
+"""
+Add 'confirmed' to the orders.status ENUM on MySQL.
+
+    python -m app.migrations.order_status_confirmed
+
+The order processor marks orders confirmed before writing the invoice URL,
+and only a confirmed order accepts one. Other backends store the enum as a
+VARCHAR and need nothing. Re-running it is harmless.
+"""
+from sqlalchemy import text
+from app.db import engine
+from app import models
+
+
+def run():
+    if engine.dialect.name != "mysql":
+        print("✅ Nothing to do for", engine.dialect.name)
+        return
+    values = ", ".join(f"'{s.value}'" for s in models.OrderStatus)
+    with engine.begin() as conn:
+        conn.execute(text(f"ALTER TABLE orders MODIFY status ENUM({values})"))
+    print(f"✅ orders.status now accepts: {values}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,24 @@
+"""
+Create the product_stock / warehouse_stock summary tables and fill them
+from inventory.
+
+    python -m app.migrations.stock_summary
+
+Run it before deploying the code that maintains the summaries. Re-running
+it is safe: it recomputes both tables and only rewrites rows that differ.
+"""
+from app.db import SessionLocal, engine
+from app import models
+from app.services.stock_summary import reconcile_stock_summaries
+
+
+def run():
+    models.ProductStock.__table__.create(engine, checkfirst=True)
+    models.WarehouseStock.__table__.create(engine, checkfirst=True)
+    with SessionLocal() as db:
+        repaired = reconcile_stock_summaries(db)
+    print(f"✅ Stock summaries ready; rows written: {repaired}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,29 @@
+"""
+Create and seed the table_versions table behind ETag / conditional GETs.
+
+    python -m app.migrations.table_versions
+
+Idempotent: existing version rows are left alone.
+"""
+from datetime import datetime
+from sqlalchemy import select
+from app.db import engine
+from app import models
+
+VERSIONED_TABLES = ("inventory", "products", "suppliers", "warehouses")
+
+
+def run():
+    table = models.TableVersion.__table__
+    with engine.begin() as conn:
+        table.create(conn, checkfirst=True)
+        existing = set(conn.execute(select(table.c.table_name)).scalars())
+        missing = [name for name in VERSIONED_TABLES if name not in existing]
+        if missing:
+            now = datetime.utcnow()
+            conn.execute(table.insert(), [{"table_name": name, "version": 1, "updated_at": now} for name in missing])
+    print(f"✅ table_versions ready; seeded: {missing or 'none'}")
+
+
+if __name__ == "__main__":
+    run()
@@ -95,7 +95,7 @@
 #     order = relationship("Order", back_populates="items")
 #     product = relationship("Product", back_populates="order_items")
 
-from sqlalchemy import Column, Integer, String, Text, DECIMAL, DateTime, Enum, ForeignKey, TIMESTAMP
+from sqlalchemy import Column, Integer, String, Text, DECIMAL, DateTime, Enum, ForeignKey, TIMESTAMP, Index
 from sqlalchemy.orm import relationship
 from app.db import Base
 import enum
@@ -104,6 +104,7 @@ import enum
 class OrderStatus(str, enum.Enum):
     created = "created"
     reserved = "reserved"
+    confirmed = "confirmed"  # set by the order processor (confirm_order)
     fulfilled = "fulfilled"
     cancelled = "cancelled"
     failed = "failed"
@@ -157,6 +158,13 @@ class Inventory(Base):
     product = relationship("Product")
     warehouse = relationship("Warehouse")
 
+    __table_args__ = (
+        # One stock row per (product, warehouse); also serves product lookups.
+        Index("uq_inventory_product_warehouse", "product_id", "warehouse_id", unique=True),
+        # Covers warehouse lookups and per-warehouse quantity sums without touching the table.
+        Index("ix_inventory_warehouse_product_qty", "warehouse_id", "product_id", "quantity"),
+    )
+
 
 class Order(Base):
     __tablename__ = "orders"
@@ -169,6 +177,9 @@ class Order(Base):
     updated_at = Column(DateTime)
     invoice_blob = Column(String(400))
 
+    # Read side only: items are written with core inserts (routes/orders.py)
+    items = relationship("OrderItem", order_by="OrderItem.order_item_id", viewonly=True)
+
 
 class OrderItem(Base):
     __tablename__ = "order_items"
@@ -177,4 +188,47 @@ class OrderItem(Base):
     order_id = Column(Integer, ForeignKey("orders.order_id"), nullable=False)
     product_id = Column(Integer, ForeignKey("products.product_id"), nullable=False)
     quantity = Column(Integer, nullable=False)
-    price = Column(DECIMAL(10,2), nullable=False)
\ No newline at end of file
+    price = Column(DECIMAL(10,2), nullable=False)
+
+
+class OrderOutbox(Base):
+    __tablename__ = "order_outbox"
+
+    outbox_id = Column(Integer, primary_key=True, index=True)
+    order_id = Column(Integer, nullable=False)
+    payload = Column(Text, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    sent_at = Column(DateTime)
+
+    __table_args__ = (
+        # Relay scans unsent rows oldest first
+        Index("ix_order_outbox_pending", "sent_at", "outbox_id"),
+    )
+
+
+class TableVersion(Base):
+    __tablename__ = "table_versions"
+
+    table_name = Column(String(64), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime)
+
+
+class ProductStock(Base):
+    __tablename__ = "product_stock"
+
+    # Sum of inventory.quantity across warehouses, kept in step by every
+    # inventory write (see app/services/stock_summary.py)
+    product_id = Column(Integer, ForeignKey("products.product_id"), primary_key=True)
+    total_quantity = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime)
+
+
+class WarehouseStock(Base):
+    __tablename__ = "warehouse_stock"
+
+    # Sum of inventory.quantity held in the warehouse; compare with
+    # Warehouse.capacity for its fill level
+    warehouse_id = Column(Integer, ForeignKey("warehouses.warehouse_id"), primary_key=True)
+    total_quantity = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime)
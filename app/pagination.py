@@ -0,0 +1,80 @@
+from typing import Optional
+from fastapi import Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from app.db import SessionLocal
+from app.responses import dump_record, respond
+
+# =========================================================
+# Keyset Pagination Configuration
+# =========================================================
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class PageParams:
+    """Query parameters shared by every list endpoint."""
+
+    def __init__(
+        self,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        after: Optional[int] = Query(None, description="Return rows with a primary key greater than this cursor"),
+        stream: bool = Query(False, description="Stream every matching row as NDJSON instead of one page"),
+    ):
+        self.limit = limit
+        self.after = after
+        self.stream = stream
+
+
+def _keyset_query(db, model, pk_column, after, criteria, options=()):
+    query = db.query(model).options(*options).filter(*criteria)
+    if after is not None:
+        query = query.filter(pk_column > after)
+    return query.order_by(pk_column)
+
+
+def stream_ndjson(model, pk_column, schema, after=None, *criteria, bind=None, options=()):
+    """Stream rows as NDJSON from a server-side cursor with flat memory use."""
+    def generate():
+        # The request session may already be closed while the body streams,
+        # so the generator owns its own session for the whole iteration.
+        db = Session(bind) if bind is not None else SessionLocal()
+        try:
+            query = _keyset_query(db, model, pk_column, after, criteria, options)
+            rows = db.execute(
+                query.statement.execution_options(stream_results=True, yield_per=STREAM_BATCH_SIZE)
+            ).scalars()
+            for row in rows:
+                yield dump_record(row, schema) + b"\n"
+        finally:
+            db.close()
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
+def paginate(db, model, pk_column, schema, page: PageParams, response: Response, *criteria, options=()):
+    """
+    Return one keyset page (or an NDJSON stream) of `model` ordered by `pk_column`.
+
+    `options` are loader options such as selectinload(...), applied to the
+    page query so related rows arrive in one extra query per page (or per
+    streamed batch) rather than one per row.
+    """
+    if page.stream:
+        # Stream from the same database (primary or replica) the request was routed to;
+        # async engines can't be driven from the streaming thread, so those fall back to SessionLocal.
+        bind = db.get_bind()
+        return stream_ndjson(model, pk_column, schema, page.after, *criteria,
+                             bind=None if bind.dialect.is_async else bind, options=options)
+
+    return respond(page_rows(db, model, pk_column, page, response, *criteria, options=options), schema, response)
+
+
+def page_rows(db, model, pk_column, page: PageParams, response: Response, *criteria, options=()):
+    """The rows of one keyset page, setting the next-page cursor header on `response`."""
+    rows = _keyset_query(db, model, pk_column, page.after, criteria, options).limit(page.limit).all()
+    if len(rows) == page.limit:
+        response.headers[NEXT_CURSOR_HEADER] = str(getattr(rows[-1], pk_column.key))
+    return rows
@@ -0,0 +1,92 @@
+import threading
+import time
+from bisect import bisect_left
+from sqlalchemy import event, exc
+
+# =========================================================
+# Checkout Wait-Time Histogram Buckets (seconds)
+# =========================================================
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Every tracked engine by name ("primary", "async", ...)
+registry = {}
+
+
+class PoolMetrics:
+    """Connection counters and checkout wait times for one engine's pool."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.engine = None
+        self._lock = threading.Lock()
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS) + 1)
+        self.wait_sum = 0.0
+        self.wait_count = 0
+        self.connects = 0
+        self.checkouts = 0
+        self.invalidations = 0
+        self.timeouts = 0
+
+    def observe_wait(self, seconds: float):
+        with self._lock:
+            self.wait_buckets[bisect_left(WAIT_BUCKETS, seconds)] += 1
+            self.wait_sum += seconds
+            self.wait_count += 1
+
+    def _incr(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def attach(self, engine):
+        """Count pool events on `engine` (a sync Engine or the sync side of an AsyncEngine)."""
+        self.engine = engine
+        event.listen(engine, "connect", lambda *a: self._incr("connects"))
+        event.listen(engine, "checkout", lambda *a: self._incr("checkouts"))
+        event.listen(engine, "invalidate", lambda *a: self._incr("invalidations"))
+        registry[self.name] = self
+        return self
+
+    def snapshot(self) -> dict:
+        pool = self.engine.pool
+        stats = {"name": self.name, "pool": pool.__class__.__name__}
+        if hasattr(pool, "checkedout"):
+            stats.update(
+                size=pool.size(),
+                checked_out=pool.checkedout(),
+                idle=pool.checkedin(),
+                overflow=max(pool.overflow(), 0),
+            )
+        with self._lock:
+            cumulative, buckets = 0, {}
+            for bound, count in zip(WAIT_BUCKETS + (float("inf"),), self.wait_buckets):
+                cumulative += count
+                buckets["+Inf" if bound == float("inf") else str(bound)] = cumulative
+            stats.update(
+                connects=self.connects,
+                checkouts=self.checkouts,
+                invalidations=self.invalidations,
+                checkout_timeouts=self.timeouts,
+                checkout_wait_seconds={"buckets": buckets, "sum": self.wait_sum, "count": self.wait_count},
+            )
+        return stats
+
+
+def instrumented_pool(base, metrics: PoolMetrics):
+    """
+    Subclass `base` (QueuePool / AsyncAdaptedQueuePool) to time how long each
+    checkout waits for a connection. SQLAlchemy has no pool event for the
+    start of a checkout, so the wait is measured around _do_get.
+    """
+    class InstrumentedPool(base):
+        def _do_get(self):
+            start = time.perf_counter()
+            try:
+                return super()._do_get()
+            except exc.TimeoutError:
+                metrics._incr("timeouts")
+                raise
+            finally:
+                metrics.observe_wait(time.perf_counter() - start)
+
+    InstrumentedPool.__name__ = base.__name__
+    return InstrumentedPool
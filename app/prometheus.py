@@ -0,0 +1,111 @@
+"""
+Prometheus text exposition (format 0.0.4) of the process's metrics:
+per-route request counts and latency histograms, in-flight requests,
+connection pool usage and catalog cache counters.
+"""
+from app import pool_metrics, request_metrics
+from app.cache import catalog_cache
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _bound(bound) -> str:
+    return "+Inf" if bound == float("inf") else repr(float(bound))
+
+
+class Exposition:
+    def __init__(self):
+        self.lines = []
+
+    def family(self, name: str, kind: str, help_text: str):
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {kind}")
+
+    def sample(self, name: str, value, **labels):
+        self.lines.append(f"{name}{_labels(**labels) if labels else ''} {value}")
+
+    def histogram(self, name: str, bounds, cumulative_counts, total, count, **labels):
+        for bound, cumulative in zip(bounds, cumulative_counts):
+            self.sample(f"{name}_bucket", cumulative, **labels, le=_bound(bound))
+        self.sample(f"{name}_sum", total, **labels)
+        self.sample(f"{name}_count", count, **labels)
+
+    def text(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+
+def _cumulative(buckets):
+    running, out = 0, []
+    for count in buckets:
+        running += count
+        out.append(running)
+    return out
+
+
+def _requests(out: Exposition):
+    series = request_metrics.snapshot()
+    bounds = request_metrics.LATENCY_BUCKETS + (float("inf"),)
+
+    out.family("http_requests_total", "counter", "HTTP requests by route template and status code.")
+    for method, route, _, _, _, statuses in series:
+        for status, count in sorted(statuses.items()):
+            out.sample("http_requests_total", count, method=method, route=route, status=status)
+
+    out.family("http_request_duration_seconds", "histogram", "HTTP request latency by route template.")
+    for method, route, count, duration_sum, buckets, _ in series:
+        out.histogram("http_request_duration_seconds", bounds, _cumulative(buckets), duration_sum, count,
+                      method=method, route=route)
+
+    out.family("http_requests_in_flight", "gauge", "HTTP requests being handled.")
+    for method, count in sorted(request_metrics.in_flight.items()):
+        out.sample("http_requests_in_flight", count, method=method)
+
+
+def _pools(out: Exposition):
+    snapshots = [metrics.snapshot() for metrics in list(pool_metrics.registry.values())]
+    for key, help_text in (("size", "Configured pool size."), ("checked_out", "Connections in use."),
+                           ("idle", "Idle connections in the pool."), ("overflow", "Connections above pool size.")):
+        out.family(f"db_pool_{key}", "gauge", help_text)
+        for stats in snapshots:
+            if key in stats:
+                out.sample(f"db_pool_{key}", stats[key], engine=stats["name"])
+    for key, help_text in (("connects", "DBAPI connections opened."), ("checkouts", "Pool checkouts."),
+                           ("invalidations", "Connections invalidated."),
+                           ("checkout_timeouts", "Checkouts that timed out waiting.")):
+        out.family(f"db_pool_{key}_total", "counter", help_text)
+        for stats in snapshots:
+            out.sample(f"db_pool_{key}_total", stats[key], engine=stats["name"])
+    out.family("db_pool_checkout_wait_seconds", "histogram", "Time spent waiting for a pooled connection.")
+    bounds = pool_metrics.WAIT_BUCKETS + (float("inf"),)
+    for stats in snapshots:
+        wait = stats["checkout_wait_seconds"]
+        out.histogram("db_pool_checkout_wait_seconds", bounds, wait["buckets"].values(), wait["sum"], wait["count"],
+                      engine=stats["name"])
+
+
+def _catalog_cache(out: Exposition):
+    stats = catalog_cache.stats()
+    caches = [(name, stats[name]) for name in ("pages", "records")]
+    out.family("catalog_cache_entries", "gauge", "Entries held by the catalog cache.")
+    for name, cache in caches:
+        out.sample("catalog_cache_entries", cache["entries"], cache=name)
+    for key in ("hits", "misses", "evictions"):
+        out.family(f"catalog_cache_{key}_total", "counter", f"Catalog cache {key}.")
+        for name, cache in caches:
+            out.sample(f"catalog_cache_{key}_total", cache[key], cache=name)
+
+
+def render() -> str:
+    out = Exposition()
+    _requests(out)
+    _pools(out)
+    _catalog_cache(out)
+    return out.text()
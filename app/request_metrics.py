@@ -0,0 +1,212 @@
+import os
+import logging
+import threading
+from bisect import bisect_left
+from datetime import datetime
+from time import perf_counter
+
+# =========================================================
+# Request Metrics Configuration
+# =========================================================
+REQUEST_METRICS_ENABLED = os.getenv("REQUEST_METRICS_ENABLED", "true").lower() == "true"
+# Application Insights export runs only when a connection string is set
+APPINSIGHTS_CONNECTION_STRING = os.getenv("APPLICATIONINSIGHTS_CONNECTION_STRING")
+APPINSIGHTS_EXPORT_INTERVAL = float(os.getenv("APPINSIGHTS_EXPORT_INTERVAL", "60"))
+
+# Request latency histogram buckets (seconds)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Route label for requests no route matched (404s, scanners), so raw paths never become labels
+UNMATCHED = "<unmatched>"
+# Anything else a client sends as a method is counted as OTHER
+KNOWN_METHODS = frozenset(("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"))
+
+logger = logging.getLogger(__name__)
+
+
+class RouteMetrics:
+    """Request counts by status and a latency histogram for one (method, route template)."""
+
+    __slots__ = ("buckets", "duration_sum", "statuses")
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.duration_sum = 0.0
+        self.statuses = {}
+
+    def observe(self, status: int, seconds: float):
+        self.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.duration_sum += seconds
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    @property
+    def count(self) -> int:
+        return sum(self.buckets)
+
+
+# Per-process, like pool_metrics.registry. Only the event loop thread
+# writes, so there is no lock; readers copy before iterating.
+routes = {}                                   # (method, route) -> RouteMetrics
+in_flight = dict.fromkeys(KNOWN_METHODS | {"OTHER"}, 0)
+
+
+class RequestMetricsMiddleware:
+    """
+    Times every HTTP request and counts it under its route template
+    ("/orders/{order_id}", not the concrete path). A plain ASGI wrapper
+    rather than BaseHTTPMiddleware, which adds a task and a body stream
+    per request; this costs a couple of microseconds.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        if method not in KNOWN_METHODS:
+            method = "OTHER"
+        # Raised before the response started: ServerErrorMiddleware answers 500
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_flight[method] += 1
+        start = perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = perf_counter() - start
+            in_flight[method] -= 1
+            # The router stores the matched route in the (shared) scope
+            route = scope.get("route")
+            key = (method, UNMATCHED if route is None else route.path)
+            metrics = routes.get(key)
+            if metrics is None:
+                metrics = routes[key] = RouteMetrics()
+            metrics.observe(status, elapsed)
+
+
+def snapshot():
+    """[(method, route, count, duration_sum, buckets, statuses)] copied off the live counters."""
+    return [
+        (method, route, metrics.count, metrics.duration_sum, list(metrics.buckets), dict(metrics.statuses))
+        for (method, route), metrics in list(routes.items())
+    ]
+
+
+# =========================================================
+# Application Insights Export
+# =========================================================
+class AppInsightsExporter:
+    """
+    Background thread that sends the traffic of each interval to
+    Application Insights as custom metrics: request counts per
+    route and status, mean latency per route, and in-flight requests.
+    The Azure exporter drops histograms, so latency goes as a mean; the
+    buckets stay available on /metrics.
+    """
+
+    def __init__(self, connection_string, interval=APPINSIGHTS_EXPORT_INTERVAL):
+        # Only needed when exporting, so imported here
+        from opencensus.ext.azure.metrics_exporter import MetricsExporter
+
+        self.exporter = MetricsExporter(connection_string=connection_string)
+        self.interval = interval
+        self._previous = {}
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="appinsights-metrics-exporter", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def collect(self):
+        """opencensus metrics for the requests completed since the previous call."""
+        from opencensus.metrics.export.metric_descriptor import MetricDescriptorType
+        from opencensus.metrics.export.value import ValueDouble, ValueLong
+
+        now = datetime.utcnow()
+        requests, durations = [], []
+        for method, route, count, duration_sum, _, statuses in snapshot():
+            prev_count, prev_sum, prev_statuses = self._previous.get((method, route), (0, 0.0, {}))
+            self._previous[(method, route)] = (count, duration_sum, statuses)
+            if count == prev_count:
+                continue
+            for status, total in statuses.items():
+                if total > prev_statuses.get(status, 0):
+                    requests.append(((method, route, str(status)), total - prev_statuses.get(status, 0)))
+            mean_ms = (duration_sum - prev_sum) / (count - prev_count) * 1000
+            durations.append(((method, route), mean_ms))
+        busy = [((method,), count) for method, count in list(in_flight.items()) if count]
+
+        return [metric for metric in (
+            _metric("http_requests", "Requests completed in the interval", "1",
+                    MetricDescriptorType.GAUGE_INT64, ValueLong, ("method", "route", "status"), requests, now),
+            _metric("http_request_duration", "Mean request latency in the interval", "ms",
+                    MetricDescriptorType.GAUGE_DOUBLE, ValueDouble, ("method", "route"), durations, now),
+            _metric("http_requests_in_flight", "Requests being handled", "1",
+                    MetricDescriptorType.GAUGE_INT64, ValueLong, ("method",), busy, now),
+        ) if metric is not None]
+
+    def export(self):
+        metrics = self.collect()
+        if metrics:
+            self.exporter.export_metrics(metrics)
+
+    def _run(self):
+        while not self._stopping.wait(self.interval):
+            try:
+                self.export()
+            except Exception:
+                logger.exception("Application Insights metrics export failed")
+
+    def stop(self):
+        self._stopping.set()
+        self._thread.join(5)
+        # Last partial interval
+        try:
+            self.export()
+        except Exception:
+            logger.exception("Application Insights metrics export failed")
+
+
+def _metric(name, description, unit, kind, value_type, label_keys, series, now):
+    from opencensus.metrics.export.metric import Metric
+    from opencensus.metrics.export.metric_descriptor import MetricDescriptor
+    from opencensus.metrics.export.point import Point
+    from opencensus.metrics.export.time_series import TimeSeries
+    from opencensus.metrics.label_key import LabelKey
+    from opencensus.metrics.label_value import LabelValue
+
+    if not series:
+        return None
+    descriptor = MetricDescriptor(name, description, unit, kind, [LabelKey(key, key) for key in label_keys])
+    return Metric(descriptor, [
+        TimeSeries([LabelValue(label) for label in labels], [Point(value_type(value), now)], None)
+        for labels, value in series
+    ])
+
+
+_exporter = None
+
+
+def start_exporter():
+    global _exporter
+    if REQUEST_METRICS_ENABLED and APPINSIGHTS_CONNECTION_STRING:
+        _exporter = AppInsightsExporter(APPINSIGHTS_CONNECTION_STRING).start()
+    return _exporter
+
+
+def stop_exporter():
+    global _exporter
+    if _exporter is not None:
+        _exporter.stop()
+        _exporter = None
@@ -0,0 +1,99 @@
+import os
+from decimal import Decimal
+from functools import lru_cache
+from typing import get_args, get_origin
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+
+# =========================================================
+# Fast Response Configuration
+# =========================================================
+# Opt-in: serialize route results with orjson and skip pydantic validation
+# of data that is already in response shape (rows read straight from the
+# ORM, dicts the route built itself). Off keeps FastAPI's normal
+# response_model validation.
+FAST_RESPONSES = os.getenv("FAST_RESPONSES", "false").lower() == "true"
+
+
+def _default(value):
+    # Prices are DECIMAL columns; the schemas expose them as float
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def _nested_schema(annotation):
+    """(schema, is_list) when a field holds another response schema, else None."""
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation, False
+    args = get_args(annotation)
+    if get_origin(annotation) is list and args and isinstance(args[0], type) and issubclass(args[0], BaseModel):
+        return args[0], True
+    return None
+
+
+@lru_cache()
+def _reader(schema):
+    """
+    Function that turns an ORM object into a dict of `schema`'s fields by
+    plain attribute access. Dicts and pydantic models are passed through:
+    the route built them, so they are already in response shape.
+    """
+    flat, nested = [], []
+    for name, field in schema.model_fields.items():
+        inner = _nested_schema(field.annotation)
+        if inner is None:
+            flat.append(name)
+        else:
+            nested.append((name, _reader(inner[0]), inner[1]))
+
+    def read(row):
+        if isinstance(row, (dict, BaseModel)):
+            return row
+        out = {name: getattr(row, name) for name in flat}
+        for name, read_nested, many in nested:
+            value = getattr(row, name)
+            if many:
+                out[name] = [read_nested(v) for v in value]
+            else:
+                out[name] = None if value is None else read_nested(value)
+        return out
+    return read
+
+
+def dump(content, schema=None) -> bytes:
+    """JSON bytes for `content` (one row or a list), read through `schema` if given."""
+    if schema is not None:
+        read = _reader(schema)
+        content = [read(row) for row in content] if isinstance(content, list) else read(content)
+    return orjson.dumps(content, default=_default)
+
+
+def dump_record(row, schema) -> bytes:
+    """One ORM row as JSON bytes, through the fast path when it is enabled."""
+    if FAST_RESPONSES:
+        return dump(row, schema)
+    return schema.model_validate(row, from_attributes=True).model_dump_json().encode()
+
+
+def respond(content, schema=None, response: Response = None):
+    """
+    What a route should return for `content`.
+
+    With FAST_RESPONSES off this is `content` itself, for FastAPI to
+    validate against the route's response_model. With it on, `content` is
+    rendered here and returned as a ready Response, which FastAPI sends
+    as-is; headers and status set on the route's injected `response` are
+    carried over, as FastAPI would do.
+    """
+    if not FAST_RESPONSES:
+        return content
+    fast = Response(content=dump(content, schema), media_type="application/json")
+    if response is not None:
+        if response.status_code:
+            fast.status_code = response.status_code
+        fast.raw_headers.extend(response.raw_headers)
+    return fast
@@ -8,11 +8,11 @@ router = APIRouter(prefix="/auth", tags=["Authentication"])
 # LOGIN ENDPOINT
 # =========================================================
 @router.post("/login")
-def login(form_data: OAuth2PasswordRequestForm = Depends()):
+async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     """
     Authenticate user and return JWT token.
     """
-    user = authenticate_user(form_data.username, form_data.password)
+    user = await authenticate_user(form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -70,47 +70,206 @@
 
 #     return db.query(models.Inventory).filter(models.Inventory.product_id == product_id).all()
 
-from fastapi import APIRouter, Depends, HTTPException, status
+import json
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from app.db import get_db
+from app.db import db_route, get_db, get_read_db, run_db
 from app import models, schemas
 from app.auth import require_role
+from app.pagination import PageParams, paginate
+from app.responses import respond
+from app.etag import bump_table_version, not_modified
+from app.services.inventory_upsert import bulk_upsert_inventory
+from app.services.stock_summary import apply_stock_deltas
+from app.services import reorder
 
 router = APIRouter(prefix="/inventory", tags=["Inventory"])
 
+MAX_BULK_ROWS = 50000
+
+
+def _commit_unique_pair(db: Session, deltas: list):
+    """
+    Flush the inventory change, fold `deltas` into the stock summaries and
+    commit, turning a duplicate (product_id, warehouse_id) into a 409.
+    """
+    try:
+        db.flush()
+        apply_stock_deltas(db, deltas)
+        bump_table_version(db, "inventory")
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Inventory record already exists for this product and warehouse",
+        )
+
 # ✅ Admin + Warehouse can add inventory
 @router.post("/", response_model=schemas.InventoryOut, dependencies=[Depends(require_role("admin", "warehouse"))])
+@db_route
 def add_inventory(item: schemas.InventoryCreate, db: Session = Depends(get_db)):
     new_item = models.Inventory(**item.dict())
     db.add(new_item)
-    db.commit()
+    _commit_unique_pair(db, [(item.product_id, item.warehouse_id, item.quantity)])
     db.refresh(new_item)
     return new_item
 
+def _parse_bulk_rows(body: bytes, ndjson: bool):
+    """
+    Decode and validate a bulk body. Returns (row count, valid items,
+    {index: error result}) for the rows that failed validation.
+    """
+    try:
+        if ndjson:
+            raw_rows = [json.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            raw_rows = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+    if not isinstance(raw_rows, list):
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+    if len(raw_rows) > MAX_BULK_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BULK_ROWS} rows per request")
+
+    items, invalid = [], {}
+    for index, raw in enumerate(raw_rows):
+        try:
+            items.append(schemas.InventoryCreate.parse_obj(raw))
+        except ValidationError as e:
+            invalid[index] = schemas.InventoryBulkResult(status="error", detail=str(e)).dict()
+    return len(raw_rows), items, invalid
+
+
+def _bulk_results(row_count: int, items: list, invalid: dict, applied: dict) -> list:
+    """One result per submitted row, in request order."""
+    valid = iter(items)
+    out = []
+    for index in range(row_count):
+        if index in invalid:
+            out.append(invalid[index])
+            continue
+        item = next(valid)
+        row_status, detail = applied[(item.product_id, item.warehouse_id)]
+        out.append({**item.dict(), "status": row_status, "detail": detail})
+    return out
+
+# ✅ Admin + Warehouse can bulk upsert inventory (JSON array or NDJSON body)
+@router.post("/bulk", response_model=list[schemas.InventoryBulkResult], dependencies=[Depends(require_role("admin", "warehouse"))])
+@db_route
+async def bulk_inventory(request: Request, response: Response, db: Session = Depends(get_db)):
+    body = await request.body()
+    ndjson = request.headers.get("content-type", "").startswith("application/x-ndjson")
+    # Up to MAX_BULK_ROWS rows: decode, validate and assemble off the event loop
+    row_count, items, invalid = await run_in_threadpool(_parse_bulk_rows, body, ndjson)
+    applied = await run_db(db, bulk_upsert_inventory, items)
+    return respond(await run_in_threadpool(_bulk_results, row_count, items, invalid, applied), response=response)
+
 # ✅ Admin + Warehouse can view inventory
 @router.get("/", response_model=list[schemas.InventoryOut], dependencies=[Depends(require_role("admin", "warehouse"))])
-def get_inventory(db: Session = Depends(get_db)):
-    return db.query(models.Inventory).all()
+@db_route
+def get_inventory(request: Request, response: Response, page: PageParams = Depends(), db: Session = Depends(get_read_db)):
+    if not page.stream:
+        unchanged = not_modified(request, response, db, "inventory")
+        if unchanged is not None:
+            return unchanged
+    return paginate(db, models.Inventory, models.Inventory.inventory_id, schemas.InventoryOut, page, response)
 
 # ✅ Admin + Warehouse can update inventory
 @router.put("/{inv_id}", response_model=schemas.InventoryOut, dependencies=[Depends(require_role("admin", "warehouse"))])
+@db_route
 def update_inventory(inv_id: int, item: schemas.InventoryCreate, db: Session = Depends(get_db)):
-    inv = db.query(models.Inventory).filter(models.Inventory.inventory_id == inv_id).first()
+    # Locked so a reservation can't change the quantity the summary deltas are built from
+    inv = db.query(models.Inventory).filter(models.Inventory.inventory_id == inv_id).with_for_update().first()
     if not inv:
         raise HTTPException(status_code=404, detail="Inventory record not found")
+    deltas = [(inv.product_id, inv.warehouse_id, -(inv.quantity or 0)), (item.product_id, item.warehouse_id, item.quantity)]
     inv.product_id = item.product_id
     inv.warehouse_id = item.warehouse_id
     inv.quantity = item.quantity
-    db.commit()
+    _commit_unique_pair(db, deltas)
     db.refresh(inv)
     return inv
 
 # ✅ Admin + Warehouse can check inventory by warehouse
 @router.get("/warehouse/{warehouse_id}", response_model=list[schemas.InventoryOut], dependencies=[Depends(require_role("admin", "warehouse"))])
-def inventory_by_warehouse(warehouse_id: int, db: Session = Depends(get_db)):
-    return db.query(models.Inventory).filter(models.Inventory.warehouse_id == warehouse_id).all()
+@db_route
+def inventory_by_warehouse(warehouse_id: int, request: Request, response: Response, page: PageParams = Depends(), db: Session = Depends(get_read_db)):
+    if not page.stream:
+        unchanged = not_modified(request, response, db, "inventory")
+        if unchanged is not None:
+            return unchanged
+    return paginate(db, models.Inventory, models.Inventory.inventory_id, schemas.InventoryOut, page, response,
+                    models.Inventory.warehouse_id == warehouse_id)
 
 # ✅ Admin + Warehouse can check inventory by product
 @router.get("/product/{product_id}", response_model=list[schemas.InventoryOut], dependencies=[Depends(require_role("admin", "warehouse"))])
-def inventory_by_product(product_id: int, db: Session = Depends(get_db)):
-    return db.query(models.Inventory).filter(models.Inventory.product_id == product_id).all()
\ No newline at end of file
+@db_route
+def inventory_by_product(product_id: int, request: Request, response: Response, page: PageParams = Depends(), db: Session = Depends(get_read_db)):
+    if not page.stream:
+        unchanged = not_modified(request, response, db, "inventory")
+        if unchanged is not None:
+            return unchanged
+    return paginate(db, models.Inventory, models.Inventory.inventory_id, schemas.InventoryOut, page, response,
+                    models.Inventory.product_id == product_id)
+
+# ✅ Admin + Warehouse can check total stock of a product across warehouses
+@router.get("/summary/product/{product_id}", response_model=schemas.ProductStockOut, dependencies=[Depends(require_role("admin", "warehouse"))])
+@db_route
+def product_stock_summary(product_id: int, db: Session = Depends(get_read_db)):
+    row = db.execute(
+        select(models.Product.product_id, models.ProductStock.total_quantity, models.ProductStock.updated_at)
+        .outerjoin(models.ProductStock, models.ProductStock.product_id == models.Product.product_id)
+        .where(models.Product.product_id == product_id)
+    ).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return {"product_id": row.product_id, "total_quantity": row.total_quantity or 0, "updated_at": row.updated_at}
+
+# ✅ Admin + Warehouse can check how full a warehouse is
+@router.get("/summary/warehouse/{warehouse_id}", response_model=schemas.WarehouseStockOut, dependencies=[Depends(require_role("admin", "warehouse"))])
+@db_route
+def warehouse_stock_summary(warehouse_id: int, db: Session = Depends(get_read_db)):
+    row = db.execute(
+        select(
+            models.Warehouse.warehouse_id,
+            models.Warehouse.capacity,
+            models.WarehouseStock.total_quantity,
+            models.WarehouseStock.updated_at,
+        )
+        .outerjoin(models.WarehouseStock, models.WarehouseStock.warehouse_id == models.Warehouse.warehouse_id)
+        .where(models.Warehouse.warehouse_id == warehouse_id)
+    ).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Warehouse not found")
+    total = row.total_quantity or 0
+    return {
+        "warehouse_id": row.warehouse_id,
+        "total_quantity": total,
+        "capacity": row.capacity,
+        "utilization": round(total / row.capacity, 4) if row.capacity else None,
+        "updated_at": row.updated_at,
+    }
+
+# ✅ Admin + Warehouse can list pairs that need reordering, most urgent first
+@router.get("/reorder", response_model=list[schemas.ReorderSuggestion], dependencies=[Depends(require_role("admin", "warehouse"))])
+@db_route
+def reorder_suggestions(
+    warehouse_id: Optional[int] = None,
+    product_id: Optional[int] = None,
+    max_days_of_cover: Optional[float] = Query(None, ge=0),
+    lead_time_days: float = Query(reorder.LEAD_TIME_DAYS, ge=0),
+    safety_days: float = Query(reorder.SAFETY_DAYS, ge=0),
+    target_cover_days: float = Query(reorder.TARGET_COVER_DAYS, ge=0),
+    window_days: int = Query(reorder.WINDOW_DAYS, ge=1, le=365),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_read_db),
+):
+    snapshot = reorder.get_snapshot(db, window_days)
+    metrics = reorder.compute_reorder(snapshot, lead_time_days, safety_days, target_cover_days)
+    return respond(reorder.reorder_candidates(snapshot, metrics, max_days_of_cover, warehouse_id, product_id, limit))
@@ -0,0 +1,38 @@
+import os
+import hmac
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
+from app import pool_metrics, prometheus
+from app.cache import catalog_cache
+from app.auth import require_role
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+# Static bearer token Prometheus sends when scraping; unset leaves /metrics open
+SCRAPE_TOKEN = os.getenv("METRICS_SCRAPE_TOKEN")
+
+
+def require_scrape_token(authorization: Optional[str] = Header(None)):
+    if SCRAPE_TOKEN and not hmac.compare_digest(authorization or "", f"Bearer {SCRAPE_TOKEN}"):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics scrape token",
+        )
+
+
+# ✅ Prometheus scrape: per-route requests and latency, pool and cache counters
+@router.get("", response_class=Response, dependencies=[Depends(require_scrape_token)])
+def prometheus_metrics():
+    return Response(content=prometheus.render(), media_type=prometheus.CONTENT_TYPE)
+
+
+# ✅ Admin only: live connection pool usage per engine
+@router.get("/db-pool", dependencies=[Depends(require_role("admin"))])
+def db_pool_metrics():
+    return [metrics.snapshot() for metrics in pool_metrics.registry.values()]
+
+
+# ✅ Admin only: catalog cache hit/miss counters
+@router.get("/catalog-cache", dependencies=[Depends(require_role("admin"))])
+def catalog_cache_metrics():
+    return catalog_cache.stats()
@@ -60,75 +60,221 @@
 #         "status": new_order.status,
 #         "items": items
 #     }
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.db import get_db
+import os
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import insert
+from sqlalchemy.orm import Session, selectinload
+from app.db import db_route, get_db, get_read_db
 from app import models, schemas
-from app.services.service_bus import publish_order_event
+from app.services.outbox import add_order_event, notify_relay
+from app.services.stock import release_shipments, reserve_shipments, reserve_stock
+from app.services.allocation import Availability, plan_allocation
+from app.etag import bump_table_version
 from app.auth import require_role
+from app.pagination import PageParams, paginate
+from app.responses import respond
 
 router = APIRouter(prefix="/orders", tags=["Orders"])
 
-# ✅ Admin + Warehouse can create orders
-@router.post("/", response_model=schemas.OrderOut, dependencies=[Depends(require_role("admin", "warehouse"))])
-def create_order(order: schemas.OrderCreate, db: Session = Depends(get_db)):
-    # Create order record
+# Items for a whole page of orders in one IN query
+WITH_ITEMS = (selectinload(models.Order.items),)
+
+# Re-plans allowed when another order takes the stock a split plan counted on
+SPLIT_ALLOCATION_ATTEMPTS = int(os.getenv("SPLIT_ALLOCATION_ATTEMPTS", "3"))
+
+
+def _write_order(db: Session, warehouse_id: int, reserved: bool, lines) -> dict:
+    """
+    Insert one order and its items, stage its outbox event and return the
+    response body. Runs inside the caller's transaction; `lines` are
+    (product_id, quantity, price) tuples.
+    """
+    now = datetime.utcnow()
     new_order = models.Order(
-        warehouse_id=order.warehouse_id,
-        status="created"
+        warehouse_id=warehouse_id,
+        status=models.OrderStatus.reserved if reserved else models.OrderStatus.failed,
+        created_at=now,
+        updated_at=now,
     )
     db.add(new_order)
-    db.commit()
-    db.refresh(new_order)
+    db.flush()
 
-    # Insert order items
-    for item in order.items:
-        order_item = models.OrderItem(
-            order_id=new_order.order_id,
-            product_id=item.product_id,
-            quantity=item.quantity,
-            price=item.price
+    if lines:
+        db.execute(
+            insert(models.OrderItem.__table__),
+            [
+                {
+                    "order_id": new_order.order_id,
+                    "product_id": product_id,
+                    "quantity": quantity,
+                    "price": price,
+                }
+                for product_id, quantity, price in lines
+            ],
         )
-        db.add(order_item)
-    db.commit()
-
-    # Fetch inserted items
-    items = db.query(models.OrderItem).filter(
-        models.OrderItem.order_id == new_order.order_id
-    ).all()
-
-    # Safe JSON event
-    event = {
+    items = [
+        {
+            "product_id": i.product_id,
+            "quantity": i.quantity,
+            "price": float(i.price),
+            "order_item_id": i.order_item_id,
+        }
+        for i in db.query(models.OrderItem).filter(
+            models.OrderItem.order_id == new_order.order_id
+        ).all()
+    ]
+    order_out = {
         "order_id": new_order.order_id,
         "warehouse_id": new_order.warehouse_id,
+        "status": new_order.status.value,
+        "items": items,
+    }
+
+    # Event is written to the outbox in the same transaction as the order
+    add_order_event(db, {
+        "order_id": order_out["order_id"],
+        "warehouse_id": order_out["warehouse_id"],
+        "status": order_out["status"],
         "items": [
-            {"product_id": i.product_id, "quantity": i.quantity, "price": float(i.price)}
+            {"product_id": i["product_id"], "quantity": i["quantity"], "price": i["price"]}
             for i in items
         ]
-    }
+    })
+    return order_out
 
-    publish_order_event(event)
 
-    return {
-        "order_id": new_order.order_id,
-        "warehouse_id": new_order.warehouse_id,
-        "status": new_order.status,
-        "items": [
-            {
-                "order_item_id": i.order_item_id,
-                "product_id": i.product_id,
-                "quantity": i.quantity,
-                "price": float(i.price)
-            } for i in items
-        ]
-    }
+def _requested_totals(order: schemas.OrderCreate) -> dict:
+    """Total quantity per product (an order may list the same SKU twice)."""
+    requested = {}
+    for item in order.items:
+        requested[item.product_id] = requested.get(item.product_id, 0) + item.quantity
+    return requested
+
+
+def _split_lines(order: schemas.OrderCreate, plan: dict) -> dict:
+    """Hand each warehouse's share of a product to the order lines, in request order."""
+    lines = {warehouse_id: [] for warehouse_id in plan}
+    for item in order.items:
+        left = item.quantity
+        for warehouse_id, shipment in plan.items():
+            share = min(left, shipment.get(item.product_id, 0))
+            if share:
+                lines[warehouse_id].append((item.product_id, share, item.price))
+                shipment[item.product_id] -= share
+                left -= share
+    return lines
+
+# ✅ Admin + Warehouse can create orders
+@router.post("/", response_model=schemas.OrderOut, dependencies=[Depends(require_role("admin", "warehouse"))])
+@db_route
+def create_order(order: schemas.OrderCreate, response: Response, db: Session = Depends(get_db)):
+    # One transaction: lock + reserve stock, write the order and its items
+    reserved = reserve_stock(db, order.warehouse_id, _requested_totals(order))
+    order_out = _write_order(
+        db, order.warehouse_id, reserved,
+        [(item.product_id, item.quantity, item.price) for item in order.items],
+    )
+    if reserved:
+        bump_table_version(db, "inventory")
+    db.commit()
+    notify_relay()
+
+    return respond(order_out, response=response)
+
+# ✅ Admin + Warehouse can create orders that may ship from several warehouses
+@router.post("/split", response_model=schemas.SplitOrderOut, dependencies=[Depends(require_role("admin", "warehouse"))])
+@db_route
+def create_split_order(order: schemas.OrderCreate, response: Response, db: Session = Depends(get_db)):
+    """
+    Fill the order from as few warehouses as possible, preferring
+    `warehouse_id` and then its region. Each warehouse's share becomes its
+    own order; all of them are reserved and written in one transaction.
+    """
+    home = db.query(models.Warehouse).filter(models.Warehouse.warehouse_id == order.warehouse_id).first()
+    if not home:
+        raise HTTPException(status_code=404, detail="Warehouse not found")
+    home_region = home.region
+    requested = _requested_totals(order)
+
+    for _ in range(SPLIT_ALLOCATION_ATTEMPTS):
+        plan = plan_allocation(Availability.load(db, requested), requested, order.warehouse_id, home_region) if requested else None
+        if plan is None:
+            break
+        # All planned rows locked in one statement, summaries updated once afterwards
+        if reserve_shipments(db, plan):
+            lines = _split_lines(order, plan)
+            orders_out = [_write_order(db, warehouse_id, True, lines[warehouse_id]) for warehouse_id in sorted(plan)]
+            bump_table_version(db, "inventory")
+            db.commit()
+            notify_relay()
+            return respond({"orders": orders_out}, response=response)
+        # Stock moved between the plan and the locks: start over from fresh numbers
+        db.rollback()
+
+    # Nothing can fill it: record a failed order at the requested warehouse, like create_order
+    order_out = _write_order(
+        db, order.warehouse_id, False,
+        [(item.product_id, item.quantity, item.price) for item in order.items],
+    )
+    db.commit()
+    notify_relay()
+    return respond({"orders": [order_out]}, response=response)
+
+# ✅ Admin + Warehouse can list orders
+@router.get("/", response_model=list[schemas.OrderOut], dependencies=[Depends(require_role("admin", "warehouse"))])
+@db_route
+def get_orders(
+    response: Response,
+    status: Optional[models.OrderStatus] = None,
+    warehouse_id: Optional[int] = None,
+    created_from: Optional[datetime] = Query(None, description="Only orders created at or after this time"),
+    created_to: Optional[datetime] = Query(None, description="Only orders created before this time"),
+    page: PageParams = Depends(),
+    db: Session = Depends(get_read_db),
+):
+    criteria = []
+    if status is not None:
+        criteria.append(models.Order.status == status)
+    if warehouse_id is not None:
+        criteria.append(models.Order.warehouse_id == warehouse_id)
+    if created_from is not None:
+        criteria.append(models.Order.created_at >= created_from)
+    if created_to is not None:
+        criteria.append(models.Order.created_at < created_to)
+    return paginate(db, models.Order, models.Order.order_id, schemas.OrderOut, page, response,
+                    *criteria, options=WITH_ITEMS)
+
+# ✅ Admin + Warehouse can view one order
+@router.get("/{order_id}", response_model=schemas.OrderOut, dependencies=[Depends(require_role("admin", "warehouse"))])
+@db_route
+def get_order(order_id: int, db: Session = Depends(get_read_db)):
+    order = db.query(models.Order).options(*WITH_ITEMS).filter(models.Order.order_id == order_id).first()
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    return respond(order, schemas.OrderOut)
 
 # ✅ Admin only can cancel/delete orders
 @router.delete("/{order_id}", dependencies=[Depends(require_role("admin"))])
+@db_route
 def cancel_order(order_id: int, db: Session = Depends(get_db)):
-    order = db.query(models.Order).filter(models.Order.order_id == order_id).first()
+    """
+    Mark the order cancelled and, if it still holds stock, put its units
+    back in one transaction. The order and its items are kept for history;
+    the row lock makes a repeated cancel release nothing.
+    """
+    order = db.query(models.Order).filter(models.Order.order_id == order_id).with_for_update().first()
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
-    db.delete(order)
+
+    if order.status == models.OrderStatus.reserved:
+        returned = {}
+        for item in db.query(models.OrderItem).filter(models.OrderItem.order_id == order_id).all():
+            returned[item.product_id] = returned.get(item.product_id, 0) + item.quantity
+        release_shipments(db, {order.warehouse_id: returned})
+        bump_table_version(db, "inventory")
+    order.status = models.OrderStatus.cancelled
+    order.updated_at = datetime.utcnow()
     db.commit()
     return {"message": f"Order {order_id} cancelled successfully."}
\ No newline at end of file
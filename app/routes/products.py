@@ -18,11 +18,14 @@
 # def get_products(db: Session = Depends(get_db)):
 #     return db.query(models.Product).all()
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
-from app.db import get_db
+from app.db import db_route, get_db, get_read_db
 from app import models, schemas
 from app.auth import verify_token, require_role  # ✅ Include role-based helper
+from app.pagination import PageParams
+from app.cache import cached_page, cached_record, catalog_cache
+from app.etag import bump_table_version
 
 router = APIRouter(prefix="/products", tags=["Products"])
 
@@ -32,10 +35,13 @@ router = APIRouter(prefix="/products", tags=["Products"])
     response_model=schemas.ProductOut,
     dependencies=[Depends(require_role("admin"))]  # Protect route for admin
 )
+@db_route
 def create_product(product: schemas.ProductCreate, db: Session = Depends(get_db)):
     new_product = models.Product(**product.dict())
     db.add(new_product)
+    bump_table_version(db, "products")
     db.commit()
+    catalog_cache.invalidate("products")
     db.refresh(new_product)
     return new_product
 
@@ -46,8 +52,23 @@ def create_product(product: schemas.ProductCreate, db: Session = Depends(get_db)
     response_model=list[schemas.ProductOut],
     dependencies=[Depends(require_role("warehouse"))]  # Warehouse or higher
 )
-def get_products(db: Session = Depends(get_db)):
-    return db.query(models.Product).all()
+@db_route
+def get_products(request: Request, response: Response, page: PageParams = Depends(), db: Session = Depends(get_read_db)):
+    return cached_page("products", db, models.Product, models.Product.product_id, schemas.ProductOut, page, request, response)
+
+
+# ✅ Admin & Warehouse: View one product
+@router.get(
+    "/{product_id}",
+    response_model=schemas.ProductOut,
+    dependencies=[Depends(require_role("admin", "warehouse"))]
+)
+@db_route
+def get_product(product_id: int, db: Session = Depends(get_read_db)):
+    product = cached_record("products", db, models.Product, models.Product.product_id, schemas.ProductOut, product_id)
+    if product is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return product
 
 
 # ✅ Admin-only: Delete a product
@@ -56,12 +77,15 @@ def get_products(db: Session = Depends(get_db)):
     status_code=status.HTTP_204_NO_CONTENT,
     dependencies=[Depends(require_role("admin"))]
 )
+@db_route
 def delete_product(product_id: int, db: Session = Depends(get_db)):
     product = db.query(models.Product).filter(models.Product.product_id == product_id).first()
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     db.delete(product)
+    bump_table_version(db, "products")
     db.commit()
+    catalog_cache.invalidate("products")
     return {"message": "Product deleted successfully"}
 
 
@@ -71,6 +95,7 @@ def delete_product(product_id: int, db: Session = Depends(get_db)):
     response_model=schemas.ProductOut,
     dependencies=[Depends(require_role("admin"))]
 )
+@db_route
 def update_product(product_id: int, updated_data: schemas.ProductCreate, db: Session = Depends(get_db)):
     product = db.query(models.Product).filter(models.Product.product_id == product_id).first()
     if not product:
@@ -78,6 +103,8 @@ def update_product(product_id: int, updated_data: schemas.ProductCreate, db: Ses
 
     for key, value in updated_data.dict().items():
         setattr(product, key, value)
+    bump_table_version(db, "products")
     db.commit()
+    catalog_cache.invalidate("products")
     db.refresh(product)
     return product
\ No newline at end of file
@@ -40,24 +40,40 @@
 # def get_suppliers(db: Session = Depends(get_db)):
 #     return db.query(models.Supplier).all()
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
-from app.db import get_db
+from app.db import db_route, get_db, get_read_db
 from app import models, schemas
 from app.auth import require_role
+from app.pagination import PageParams
+from app.cache import cached_page, cached_record, catalog_cache
+from app.etag import bump_table_version
 
 router = APIRouter(prefix="/suppliers", tags=["Suppliers"])
 
 # ✅ Admin only
 @router.post("/", response_model=schemas.SupplierOut, dependencies=[Depends(require_role("admin"))])
+@db_route
 def create_supplier(supplier: schemas.SupplierCreate, db: Session = Depends(get_db)):
     new_supplier = models.Supplier(**supplier.dict())
     db.add(new_supplier)
+    bump_table_version(db, "suppliers")
     db.commit()
+    catalog_cache.invalidate("suppliers")
     db.refresh(new_supplier)
     return new_supplier
 
 # ✅ Admin + Warehouse
 @router.get("/", response_model=list[schemas.SupplierOut], dependencies=[Depends(require_role("admin", "warehouse"))])
-def get_suppliers(db: Session = Depends(get_db)):
-    return db.query(models.Supplier).all()
\ No newline at end of file
+@db_route
+def get_suppliers(request: Request, response: Response, page: PageParams = Depends(), db: Session = Depends(get_read_db)):
+    return cached_page("suppliers", db, models.Supplier, models.Supplier.supplier_id, schemas.SupplierOut, page, request, response)
+
+# ✅ Admin + Warehouse
+@router.get("/{supplier_id}", response_model=schemas.SupplierOut, dependencies=[Depends(require_role("admin", "warehouse"))])
+@db_route
+def get_supplier(supplier_id: int, db: Session = Depends(get_read_db)):
+    supplier = cached_record("suppliers", db, models.Supplier, models.Supplier.supplier_id, schemas.SupplierOut, supplier_id)
+    if supplier is None:
+        raise HTTPException(status_code=404, detail="Supplier not found")
+    return supplier
\ No newline at end of file
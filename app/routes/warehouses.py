@@ -17,24 +17,40 @@
 # def get_warehouses(db: Session = Depends(get_db)):
 #     return db.query(models.Warehouse).all()
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
-from app.db import get_db
+from app.db import db_route, get_db, get_read_db
 from app import models, schemas
 from app.auth import require_role
+from app.pagination import PageParams
+from app.cache import cached_page, cached_record, catalog_cache
+from app.etag import bump_table_version
 
 router = APIRouter(prefix="/warehouses", tags=["Warehouses"])
 
 # ✅ Admin only
 @router.post("/", response_model=schemas.WarehouseOut, dependencies=[Depends(require_role("admin"))])
+@db_route
 def create_warehouse(warehouse: schemas.WarehouseCreate, db: Session = Depends(get_db)):
     new_warehouse = models.Warehouse(**warehouse.dict())
     db.add(new_warehouse)
+    bump_table_version(db, "warehouses")
     db.commit()
+    catalog_cache.invalidate("warehouses")
     db.refresh(new_warehouse)
     return new_warehouse
 
 # ✅ Admin + Warehouse
 @router.get("/", response_model=list[schemas.WarehouseOut], dependencies=[Depends(require_role("admin", "warehouse"))])
-def get_warehouses(db: Session = Depends(get_db)):
-    return db.query(models.Warehouse).all()
\ No newline at end of file
+@db_route
+def get_warehouses(request: Request, response: Response, page: PageParams = Depends(), db: Session = Depends(get_read_db)):
+    return cached_page("warehouses", db, models.Warehouse, models.Warehouse.warehouse_id, schemas.WarehouseOut, page, request, response)
+
+# ✅ Admin + Warehouse
+@router.get("/{warehouse_id}", response_model=schemas.WarehouseOut, dependencies=[Depends(require_role("admin", "warehouse"))])
+@db_route
+def get_warehouse(warehouse_id: int, db: Session = Depends(get_read_db)):
+    warehouse = cached_record("warehouses", db, models.Warehouse, models.Warehouse.warehouse_id, schemas.WarehouseOut, warehouse_id)
+    if warehouse is None:
+        raise HTTPException(status_code=404, detail="Warehouse not found")
+    return warehouse
\ No newline at end of file
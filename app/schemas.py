@@ -2,6 +2,7 @@
 from pydantic import BaseModel, Field
 from typing import Optional, List
 from decimal import Decimal
+from datetime import datetime
 
 # -------- SUPPLIERS --------
 class SupplierCreate(BaseModel):
@@ -60,16 +61,48 @@ class InventoryCreate(BaseModel):
 
 class InventoryOut(InventoryCreate):
     inventory_id: int
-    last_updated: Optional[str] = None
+    last_updated: Optional[datetime] = None
 
     class Config:
         orm_mode = True
 
 
+class InventoryBulkResult(BaseModel):
+    product_id: Optional[int] = None
+    warehouse_id: Optional[int] = None
+    quantity: Optional[int] = None
+    status: str
+    detail: Optional[str] = None
+
+
 # -------- ORDERS --------
-class OrderItemCreate(BaseModel):
+class ProductStockOut(BaseModel):
     product_id: int
+    total_quantity: int
+    updated_at: Optional[datetime] = None
+
+
+class WarehouseStockOut(BaseModel):
+    warehouse_id: int
+    total_quantity: int
+    capacity: Optional[int] = None
+    utilization: Optional[float] = None
+    updated_at: Optional[datetime] = None
+
+
+class ReorderSuggestion(BaseModel):
+    product_id: int
+    warehouse_id: int
     quantity: int
+    daily_demand: float
+    days_of_cover: Optional[float] = None  # None when there was no demand
+    reorder_point: float
+    suggested_quantity: int
+
+
+class OrderItemCreate(BaseModel):
+    product_id: int
+    quantity: int = Field(..., gt=0)
     price: float
 
 class OrderCreate(BaseModel):
@@ -89,4 +122,8 @@ class OrderOut(BaseModel):
     items: List[OrderItemOut]
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+
+class SplitOrderOut(BaseModel):
+    orders: List[OrderOut]
@@ -0,0 +1,79 @@
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app import models
+
+inventory_table = models.Inventory.__table__
+warehouses_table = models.Warehouse.__table__
+
+
+class Availability:
+    """
+    Stock of the ordered products in every warehouse that holds any:
+    matrix[w, p] is the quantity of product_ids[p] in warehouse_ids[w].
+    """
+
+    def __init__(self, warehouse_ids, regions, product_ids, matrix):
+        self.warehouse_ids = warehouse_ids
+        self.regions = regions
+        self.product_ids = product_ids
+        self.matrix = matrix
+
+    @classmethod
+    def load(cls, db: Session, product_ids):
+        """One unlocked read; the reservation re-checks every quantity under lock."""
+        product_ids = sorted(product_ids)
+        rows = db.execute(
+            select(inventory_table.c.warehouse_id, warehouses_table.c.region, inventory_table.c.product_id, inventory_table.c.quantity)
+            .join(warehouses_table, warehouses_table.c.warehouse_id == inventory_table.c.warehouse_id)
+            .where(inventory_table.c.product_id.in_(product_ids), inventory_table.c.quantity > 0)
+        ).all()
+
+        warehouse_index, regions = {}, []
+        for r in rows:
+            if r.warehouse_id not in warehouse_index:
+                warehouse_index[r.warehouse_id] = len(regions)
+                regions.append(r.region)
+        product_index = {pid: i for i, pid in enumerate(product_ids)}
+        matrix = np.zeros((len(regions), len(product_ids)), dtype=np.int64)
+        for r in rows:
+            matrix[warehouse_index[r.warehouse_id], product_index[r.product_id]] = r.quantity
+        return cls(np.array(list(warehouse_index), dtype=np.int64), regions, product_ids, matrix)
+
+
+def plan_allocation(availability: Availability, requested: dict, home_warehouse_id: int, home_region):
+    """
+    Choose which warehouse ships how much of each product.
+
+    Greedy set cover: each round takes the warehouse that completes the most
+    remaining lines, breaking ties by most units, then home warehouse, then
+    same region as the home warehouse, and takes everything it can supply.
+    Fewest shipments comes first; home and region only decide between equals,
+    so a home warehouse with little stock never forces an extra shipment.
+
+    Returns {warehouse_id: {product_id: quantity}}, or None if the network
+    cannot fill the order.
+    """
+    remaining = np.array([requested.get(pid, 0) for pid in availability.product_ids], dtype=np.int64)
+    matrix = availability.matrix.copy()
+    is_home = availability.warehouse_ids == home_warehouse_id
+    same_region = np.array([home_region is not None and r == home_region for r in availability.regions], dtype=bool)
+
+    plan = {}
+    while remaining.any():
+        take = np.minimum(matrix, remaining)
+        units = take.sum(axis=1)
+        if not len(units) or units.max() == 0:
+            return None
+        completed = ((take == remaining) & (remaining > 0)).sum(axis=1)
+        # Units rank ahead of home/region, so an empty warehouse never wins either
+        best = np.lexsort((same_region, is_home, units, completed))[-1]
+
+        shipment = {
+            availability.product_ids[p]: int(take[best, p])
+            for p in np.flatnonzero(take[best])
+        }
+        plan[int(availability.warehouse_ids[best])] = shipment
+        remaining -= take[best]
+        matrix[best] = 0
+    return plan
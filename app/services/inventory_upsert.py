@@ -0,0 +1,107 @@
+from datetime import datetime
+from sqlalchemy import select, tuple_
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app import models
+from app.etag import bump_table_version
+from app.services.stock_summary import apply_stock_deltas
+
+# Rows per upsert transaction
+CHUNK_SIZE = 1000
+
+inventory_table = models.Inventory.__table__
+
+
+def _upsert_statement(dialect_name: str):
+    """
+    Build an upsert keyed on (product_id, warehouse_id).
+
+    The statement carries no values so its compiled form is cached; executing
+    it with a list of rows lets SQLAlchemy batch them into multi-row INSERTs.
+    """
+    if dialect_name == "mysql":
+        stmt = mysql_insert(inventory_table)
+        return stmt.on_duplicate_key_update(
+            quantity=stmt.inserted.quantity,
+            last_updated=stmt.inserted.last_updated,
+        )
+    if dialect_name == "sqlite":
+        stmt = sqlite_insert(inventory_table)
+        return stmt.on_conflict_do_update(
+            index_elements=["product_id", "warehouse_id"],
+            set_={"quantity": stmt.excluded.quantity, "last_updated": stmt.excluded.last_updated},
+        )
+    raise ValueError(f"Bulk upsert is not supported for the '{dialect_name}' dialect")
+
+
+def _existing_quantities(db: Session, pairs: list) -> dict:
+    """Current quantity per existing pair, locked so the summary deltas stay exact."""
+    rows = db.execute(
+        select(inventory_table.c.product_id, inventory_table.c.warehouse_id, inventory_table.c.quantity)
+        .where(tuple_(inventory_table.c.product_id, inventory_table.c.warehouse_id).in_(pairs))
+        .with_for_update()
+    ).all()
+    return {(r.product_id, r.warehouse_id): r.quantity or 0 for r in rows}
+
+
+def _write_rows(db: Session, dialect_name: str, rows: list) -> dict:
+    """Upsert `rows` and their summary deltas; returns the quantities they replaced."""
+    existing = _existing_quantities(db, [(r["product_id"], r["warehouse_id"]) for r in rows])
+    db.execute(_upsert_statement(dialect_name), rows)
+    apply_stock_deltas(db, [
+        (r["product_id"], r["warehouse_id"], r["quantity"] - existing.get((r["product_id"], r["warehouse_id"]), 0))
+        for r in rows
+    ])
+    bump_table_version(db, "inventory")
+    return existing
+
+
+def _apply_chunk(db: Session, dialect_name: str, rows: list) -> dict:
+    """Upsert one chunk in its own transaction; returns status per (product_id, warehouse_id)."""
+    pairs = [(r["product_id"], r["warehouse_id"]) for r in rows]
+    try:
+        existing = _write_rows(db, dialect_name, rows)
+        db.commit()
+        return {pair: ("updated" if pair in existing else "inserted", None) for pair in pairs}
+    except IntegrityError:
+        db.rollback()
+
+    # A bad row (e.g. unknown product) fails the whole statement; isolate it row by row.
+    results = {}
+    for row in rows:
+        pair = (row["product_id"], row["warehouse_id"])
+        try:
+            existing = _write_rows(db, dialect_name, [row])
+            db.commit()
+            results[pair] = ("updated" if existing else "inserted", None)
+        except IntegrityError as e:
+            db.rollback()
+            results[pair] = ("error", str(e.orig))
+    return results
+
+
+def bulk_upsert_inventory(db: Session, items: list) -> dict:
+    """
+    Upsert (product_id, warehouse_id, quantity) rows in chunked transactions.
+
+    Later rows win when a pair appears more than once. Returns a mapping of
+    (product_id, warehouse_id) -> (status, detail).
+    """
+    now = datetime.utcnow()
+    deduped = {}
+    for item in items:
+        deduped[(item.product_id, item.warehouse_id)] = {
+            "product_id": item.product_id,
+            "warehouse_id": item.warehouse_id,
+            "quantity": item.quantity,
+            "last_updated": now,
+        }
+
+    dialect_name = db.get_bind().dialect.name
+    rows = list(deduped.values())
+    results = {}
+    for start in range(0, len(rows), CHUNK_SIZE):
+        results.update(_apply_chunk(db, dialect_name, rows[start:start + CHUNK_SIZE]))
+    return results
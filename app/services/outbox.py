@@ -0,0 +1,113 @@
+import os
+import json
+import logging
+import threading
+from datetime import datetime
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from app.db import SessionLocal
+from app import models
+from app.services import service_bus
+from order_processor.event_codec import encode_event
+
+BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "0.5"))
+
+outbox_table = models.OrderOutbox.__table__
+logger = logging.getLogger(__name__)
+
+
+def add_order_event(db: Session, order_event: dict):
+    """Stage an order event in the caller's transaction; the relay publishes it after commit."""
+    db.add(models.OrderOutbox(
+        order_id=order_event["order_id"],
+        payload=json.dumps(order_event),
+        created_at=datetime.utcnow(),
+    ))
+
+
+def relay_batch(limit: int = BATCH_SIZE) -> int:
+    """
+    Publish up to `limit` unsent events, oldest first, and mark them sent.
+
+    Rows are claimed with FOR UPDATE SKIP LOCKED so several replicas can relay
+    in parallel without double-sending. If the send or the commit fails the
+    rows stay unsent and are retried (at-least-once delivery).
+    """
+    with SessionLocal() as db:
+        rows = db.execute(
+            select(outbox_table.c.outbox_id, outbox_table.c.payload)
+            .where(outbox_table.c.sent_at.is_(None))
+            .order_by(outbox_table.c.outbox_id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        ).all()
+        if not rows:
+            return 0
+
+        # Outbox rows stay JSON text; the wire encoding is chosen at send time
+        service_bus.get_publisher().send([encode_event(json.loads(r.payload)) for r in rows])
+        db.execute(
+            update(outbox_table)
+            .where(outbox_table.c.outbox_id.in_([r.outbox_id for r in rows]))
+            .values(sent_at=datetime.utcnow())
+        )
+        db.commit()
+        return len(rows)
+
+
+class OutboxRelay:
+    """Background thread that drains order_outbox into Service Bus."""
+
+    def __init__(self, batch_size=BATCH_SIZE, poll_interval=POLL_INTERVAL):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="order-outbox-relay", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def wake(self):
+        self._wake.set()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                sent = relay_batch(self.batch_size)
+            except Exception:
+                logger.exception("Outbox relay failed, retrying in %.1fs", self.poll_interval)
+                sent = 0
+            # A full batch means more may be waiting: go again right away
+            if sent < self.batch_size:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def stop(self):
+        self._stopping.set()
+        self._wake.set()
+        self._thread.join(self.poll_interval + 5)
+
+
+_relay = None
+
+
+def start_relay() -> OutboxRelay:
+    global _relay
+    _relay = OutboxRelay().start()
+    return _relay
+
+
+def stop_relay():
+    global _relay
+    if _relay is not None:
+        _relay.stop()
+        _relay = None
+
+
+def notify_relay():
+    """Wake this worker's relay so a fresh event goes out without waiting for the next poll."""
+    if _relay is not None:
+        _relay.wake()
@@ -0,0 +1,169 @@
+import os
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from app import models
+from app.etag import table_version
+from app.lru import LRUCache
+
+# =========================================================
+# Reorder Defaults (overridable per request)
+# =========================================================
+WINDOW_DAYS = int(os.getenv("REORDER_WINDOW_DAYS", "30"))
+LEAD_TIME_DAYS = float(os.getenv("REORDER_LEAD_TIME_DAYS", "7"))
+SAFETY_DAYS = float(os.getenv("REORDER_SAFETY_DAYS", "3"))
+TARGET_COVER_DAYS = float(os.getenv("REORDER_TARGET_COVER_DAYS", "30"))
+# Loaded snapshots are reused until inventory changes or this many seconds pass
+SNAPSHOT_TTL = float(os.getenv("REORDER_SNAPSHOT_TTL", "60"))
+
+FETCH_BATCH = 50000
+# Orders that took stock out of a warehouse
+DEMAND_STATUSES = (models.OrderStatus.reserved, models.OrderStatus.confirmed, models.OrderStatus.fulfilled)
+
+inventory_table = models.Inventory.__table__
+orders_table = models.Order.__table__
+order_items_table = models.OrderItem.__table__
+
+
+def _fetch_array(db: Session, stmt, dtype) -> np.ndarray:
+    """
+    Run `stmt` and return its rows as one 2-D array.
+
+    Rows are read from the DB-API cursor in batches instead of through
+    SQLAlchemy Row objects, which cost more than the whole vectorized pass
+    on a million rows. Server-side cursors have already buffered the first
+    row into the Result, so that one is taken through the Result.
+    """
+    result = db.execute(stmt.execution_options(stream_results=True))
+    width = len(result.keys())
+    try:
+        chunks = [np.array([tuple(r) for r in result.fetchmany(1)], dtype=dtype).reshape(-1, width)]
+        # The Result lets go of the cursor once it is exhausted
+        while result.cursor is not None:
+            rows = result.cursor.fetchmany(FETCH_BATCH)
+            if not rows:
+                break
+            chunks.append(np.array(rows, dtype=dtype))
+    finally:
+        result.close()
+    return np.concatenate(chunks)
+
+
+class StockSnapshot:
+    """
+    On-hand stock and demand over the last `window_days` for every
+    (product, warehouse) inventory row, as parallel arrays sorted by pair.
+    """
+
+    def __init__(self, product_ids, warehouse_ids, quantity, demand, window_days):
+        self.product_ids = product_ids
+        self.warehouse_ids = warehouse_ids
+        self.quantity = quantity
+        self.demand = demand
+        self.window_days = window_days
+
+    @classmethod
+    def load(cls, db: Session, window_days: int):
+        stock = _fetch_array(db, select(
+            inventory_table.c.product_id,
+            inventory_table.c.warehouse_id,
+            func.coalesce(inventory_table.c.quantity, 0),
+        ), np.int64)
+
+        since = datetime.utcnow() - timedelta(days=window_days)
+        sold = _fetch_array(db, (
+            select(order_items_table.c.product_id, orders_table.c.warehouse_id, func.sum(order_items_table.c.quantity))
+            .join(orders_table, orders_table.c.order_id == order_items_table.c.order_id)
+            .where(orders_table.c.created_at >= since, orders_table.c.status.in_(DEMAND_STATUSES))
+            .group_by(order_items_table.c.product_id, orders_table.c.warehouse_id)
+        ), np.float64)
+
+        # One int64 key per pair, so demand lines up with stock via a sorted search
+        stride = int(max(stock[:, 1].max(initial=0), sold[:, 1].max(initial=0))) + 1
+        keys = stock[:, 0] * stride + stock[:, 1]
+        order = np.argsort(keys, kind="stable")
+        keys, stock = keys[order], stock[order]
+
+        demand = np.zeros(len(stock))
+        if len(sold):
+            sold_keys = sold[:, 0].astype(np.int64) * stride + sold[:, 1].astype(np.int64)
+            at = np.minimum(np.searchsorted(keys, sold_keys), max(len(keys) - 1, 0))
+            matched = (keys[at] == sold_keys) if len(keys) else np.zeros(len(sold_keys), bool)
+            demand[at[matched]] = sold[matched, 2]
+
+        return cls(stock[:, 0], stock[:, 1], stock[:, 2], demand, window_days)
+
+
+def compute_reorder(snapshot: StockSnapshot, lead_time_days=LEAD_TIME_DAYS, safety_days=SAFETY_DAYS,
+                    target_cover_days=TARGET_COVER_DAYS) -> dict:
+    """
+    Days of cover, reorder point and suggested order size for every pair
+    in one vectorized pass.
+
+    reorder_point is the stock that covers the supplier lead time plus a
+    safety margin at the current daily demand. suggested_quantity tops the
+    pair back up to `target_cover_days` beyond that.
+    """
+    daily = snapshot.demand / snapshot.window_days
+    quantity = snapshot.quantity.astype(np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cover = np.where(daily > 0, quantity / daily, np.inf)
+    reorder_point = daily * (lead_time_days + safety_days)
+    suggested = np.ceil(np.maximum(reorder_point + daily * target_cover_days - quantity, 0))
+    return {
+        "daily_demand": daily,
+        "days_of_cover": cover,
+        "reorder_point": reorder_point,
+        "suggested_quantity": suggested,
+    }
+
+
+def reorder_candidates(snapshot: StockSnapshot, metrics: dict, max_days_of_cover=None,
+                       warehouse_id=None, product_id=None, limit=100) -> list:
+    """
+    Pairs at or below their reorder point (or with at most
+    `max_days_of_cover` days of stock left), most urgent first.
+    """
+    selected = (snapshot.quantity <= metrics["reorder_point"]) & (metrics["daily_demand"] > 0)
+    if max_days_of_cover is not None:
+        selected |= metrics["days_of_cover"] <= max_days_of_cover
+    if warehouse_id is not None:
+        selected &= snapshot.warehouse_ids == warehouse_id
+    if product_id is not None:
+        selected &= snapshot.product_ids == product_id
+
+    index = np.flatnonzero(selected)
+    cover = metrics["days_of_cover"][index]
+    if len(index) > limit:
+        # Only the `limit` most urgent need a full sort
+        keep = np.argpartition(cover, limit - 1)[:limit]
+        index, cover = index[keep], cover[keep]
+    index = index[np.argsort(cover, kind="stable")]
+
+    return [
+        {
+            "product_id": int(snapshot.product_ids[i]),
+            "warehouse_id": int(snapshot.warehouse_ids[i]),
+            "quantity": int(snapshot.quantity[i]),
+            "daily_demand": round(float(metrics["daily_demand"][i]), 4),
+            "days_of_cover": None if np.isinf(metrics["days_of_cover"][i]) else round(float(metrics["days_of_cover"][i]), 2),
+            "reorder_point": round(float(metrics["reorder_point"][i]), 2),
+            "suggested_quantity": int(metrics["suggested_quantity"][i]),
+        }
+        for i in index
+    ]
+
+
+# Keyed on the inventory version, which every stock write and reservation bumps
+_snapshots = LRUCache(8, SNAPSHOT_TTL)
+
+
+def get_snapshot(db: Session, window_days: int = WINDOW_DAYS) -> StockSnapshot:
+    version, _ = table_version(db, "inventory")
+    key = (version, window_days)
+    snapshot = _snapshots.get(key)
+    if snapshot is None:
+        snapshot = StockSnapshot.load(db, window_days)
+        _snapshots.set(key, snapshot)
+    return snapshot
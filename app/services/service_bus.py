@@ -1,6 +1,8 @@
 import os
-import json
+import logging
+import threading
 from azure.servicebus import ServiceBusClient, ServiceBusMessage
+from azure.servicebus.exceptions import MessageSizeExceededError
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -8,17 +10,108 @@ load_dotenv()
 CONN_STR = os.getenv("SERVICE_BUS_CONNECTION_STRING")
 QUEUE_NAME = os.getenv("SERVICE_BUS_QUEUE_NAME")
 
+# "azure" (default) or "memory" for tests and local runs without a broker
+TRANSPORT = os.getenv("SERVICE_BUS_TRANSPORT", "azure")
 
-def publish_order_event(order_event: dict):
+logger = logging.getLogger(__name__)
+
+
+# =========================================================
+# Transports
+# =========================================================
+class AzureServiceBusTransport:
+    """One long-lived AMQP connection and queue sender, reused for every batch."""
+
+    def __init__(self, conn_str: str, queue_name: str):
+        self.queue_name = queue_name
+        self.client = ServiceBusClient.from_connection_string(conn_str)
+        self.sender = self.client.get_queue_sender(queue_name=queue_name)
+
+    def send(self, bodies: list):
+        batch = self.sender.create_message_batch()
+        for body in bodies:
+            try:
+                batch.add_message(ServiceBusMessage(body))
+            except MessageSizeExceededError:
+                # Batch is full: ship it and start a new one
+                self.sender.send_messages(batch)
+                batch = self.sender.create_message_batch()
+                batch.add_message(ServiceBusMessage(body))
+        self.sender.send_messages(batch)
+
+    def close(self):
+        self.sender.close()
+        self.client.close()
+
+
+class InMemoryTransport:
+    """Collects sent message bodies in a list instead of talking to Azure."""
+
+    def __init__(self):
+        self.sent = []
+        self.batches = 0
+
+    def send(self, bodies: list):
+        self.sent.extend(bodies)
+        self.batches += 1
+
+    def close(self):
+        pass
+
+
+def create_transport():
+    if TRANSPORT == "memory":
+        return InMemoryTransport()
     if not CONN_STR or not QUEUE_NAME:
         raise ValueError("Service Bus connection details are missing in .env")
+    return AzureServiceBusTransport(CONN_STR, QUEUE_NAME)
+
+
+# =========================================================
+# Publisher
+# =========================================================
+class OrderEventPublisher:
+    """
+    The worker's Service Bus sender. The outbox relay is its only caller:
+    events are staged in order_outbox with the order and sent from there,
+    so nothing is queued in memory.
+    """
+
+    def __init__(self, transport):
+        self.transport = transport
+        self._send_lock = threading.Lock()
+
+    def send(self, bodies: list):
+        """Send pre-encoded message bodies right away; raises if the broker rejects them."""
+        with self._send_lock:
+            self.transport.send(bodies)
+
+    def stop(self):
+        with self._send_lock:
+            self.transport.close()
+
+
+# =========================================================
+# App-wide Publisher (owned by the FastAPI lifespan)
+# =========================================================
+_publisher = None
+
+
+def start_publisher(transport=None) -> OrderEventPublisher:
+    global _publisher
+    _publisher = OrderEventPublisher(transport or create_transport())
+    return _publisher
+
+
+def stop_publisher():
+    global _publisher
+    if _publisher is not None:
+        _publisher.stop()
+        _publisher = None
 
-    message_body = json.dumps(order_event)
 
-    with ServiceBusClient.from_connection_string(CONN_STR) as client:
-        sender = client.get_queue_sender(queue_name=QUEUE_NAME)
-        with sender:
-            message = ServiceBusMessage(message_body)
-            sender.send_messages(message)
+def get_publisher() -> OrderEventPublisher:
+    if _publisher is None:
+        raise RuntimeError("Order event publisher is not running")
+    return _publisher
 
-    print(f" Order event sent to Service Bus queue: {QUEUE_NAME}")
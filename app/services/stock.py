@@ -0,0 +1,97 @@
+from datetime import datetime
+from collections import defaultdict
+from sqlalchemy import case, select, tuple_, update
+from sqlalchemy.orm import Session
+from app import models
+from app.services.stock_summary import apply_stock_deltas
+
+inventory_table = models.Inventory.__table__
+
+
+def lock_inventory(db: Session, pairs) -> dict:
+    """
+    Lock the inventory rows for `pairs` ((product_id, warehouse_id)) with a
+    single SELECT ... FOR UPDATE. Rows are locked in (product_id,
+    warehouse_id) order, the order of uq_inventory_product_warehouse and of
+    the bulk upsert, so writers touching the same rows always queue instead
+    of deadlocking.
+
+    Returns {(product_id, warehouse_id): row} for the rows that exist.
+    """
+    rows = db.execute(
+        select(
+            inventory_table.c.inventory_id, inventory_table.c.product_id,
+            inventory_table.c.warehouse_id, inventory_table.c.quantity,
+        )
+        .where(tuple_(inventory_table.c.product_id, inventory_table.c.warehouse_id).in_(sorted(pairs)))
+        .order_by(inventory_table.c.product_id, inventory_table.c.warehouse_id)
+        .with_for_update()
+    ).all()
+    return {(r.product_id, r.warehouse_id): r for r in rows}
+
+
+def reserve_shipments(db: Session, shipments: dict) -> bool:
+    """
+    Reserve {warehouse_id: {product_id: quantity}} inside the caller's
+    transaction. Every inventory row is locked up front in one statement
+    and the stock summaries are updated once at the end, so no summary
+    lock is held while waiting for an inventory lock. Either every line is
+    decremented or nothing is.
+    """
+    requested = {
+        (product_id, warehouse_id): quantity
+        for warehouse_id, lines in shipments.items()
+        for product_id, quantity in lines.items()
+    }
+    if not requested:
+        return False
+
+    locked = lock_inventory(db, requested)
+    for pair, quantity in requested.items():
+        row = locked.get(pair)
+        if row is None or (row.quantity or 0) < quantity:
+            return False
+
+    decrements = {locked[pair].inventory_id: qty for pair, qty in requested.items()}
+    db.execute(
+        update(inventory_table)
+        .where(inventory_table.c.inventory_id.in_(list(decrements)))
+        .values(
+            quantity=inventory_table.c.quantity - case(decrements, value=inventory_table.c.inventory_id),
+            last_updated=datetime.utcnow(),
+        )
+    )
+    apply_stock_deltas(db, [(pid, wid, -qty) for (pid, wid), qty in requested.items()])
+    return True
+
+
+def reserve_stock(db: Session, warehouse_id: int, requested: dict) -> bool:
+    """Reserve `requested` ({product_id: quantity}) from one warehouse; see reserve_shipments."""
+    return reserve_shipments(db, {warehouse_id: requested})
+
+
+def release_shipments(db: Session, shipments: dict):
+    """
+    Put {warehouse_id: {product_id: quantity}} back on the shelf inside the
+    caller's transaction, the reverse of reserve_shipments: the same locked,
+    sorted inventory read, one UPDATE and the summaries last. Rows deleted
+    since the reservation have nothing to return to and are skipped.
+    """
+    released = defaultdict(int)
+    for warehouse_id, lines in shipments.items():
+        for product_id, quantity in lines.items():
+            released[(product_id, warehouse_id)] += quantity
+    locked = lock_inventory(db, released)
+    if not locked:
+        return
+
+    increments = {row.inventory_id: released[pair] for pair, row in locked.items()}
+    db.execute(
+        update(inventory_table)
+        .where(inventory_table.c.inventory_id.in_(list(increments)))
+        .values(
+            quantity=inventory_table.c.quantity + case(increments, value=inventory_table.c.inventory_id),
+            last_updated=datetime.utcnow(),
+        )
+    )
+    apply_stock_deltas(db, [(pid, wid, released[(pid, wid)]) for pid, wid in locked])
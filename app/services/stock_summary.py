@@ -0,0 +1,145 @@
+import os
+import logging
+import threading
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import func, select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from app.db import SessionLocal
+from app import models
+
+# Seconds between drift repairs; 0 disables the background job
+RECONCILE_INTERVAL = float(os.getenv("STOCK_RECONCILE_INTERVAL", "3600"))
+
+inventory_table = models.Inventory.__table__
+product_stock = models.ProductStock.__table__
+warehouse_stock = models.WarehouseStock.__table__
+logger = logging.getLogger(__name__)
+
+
+def _add_statement(dialect_name: str, table, key: str):
+    """Upsert that adds the incoming total_quantity to the stored one."""
+    if dialect_name == "mysql":
+        stmt = mysql_insert(table)
+        return stmt.on_duplicate_key_update(
+            total_quantity=table.c.total_quantity + stmt.inserted.total_quantity,
+            updated_at=stmt.inserted.updated_at,
+        )
+    if dialect_name == "sqlite":
+        stmt = sqlite_insert(table)
+        return stmt.on_conflict_do_update(
+            index_elements=[key],
+            set_={
+                "total_quantity": table.c.total_quantity + stmt.excluded.total_quantity,
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+    raise ValueError(f"Stock summaries are not supported for the '{dialect_name}' dialect")
+
+
+def apply_stock_deltas(db: Session, deltas):
+    """
+    Fold inventory quantity changes into product_stock and warehouse_stock
+    inside the caller's transaction.
+
+    `deltas` is an iterable of (product_id, warehouse_id, change). Call it
+    after the inventory rows are written and before bump_table_version:
+    summary rows are locked in ascending key order, products before
+    warehouses, so concurrent writers queue instead of deadlocking.
+    """
+    by_product, by_warehouse = defaultdict(int), defaultdict(int)
+    for product_id, warehouse_id, change in deltas:
+        by_product[product_id] += change
+        by_warehouse[warehouse_id] += change
+
+    dialect_name = db.get_bind().dialect.name
+    now = datetime.utcnow()
+    for table, key, totals in (
+        (product_stock, "product_id", by_product),
+        (warehouse_stock, "warehouse_id", by_warehouse),
+    ):
+        rows = [
+            {key: k, "total_quantity": change, "updated_at": now}
+            for k, change in sorted(totals.items()) if change
+        ]
+        if rows:
+            db.execute(_add_statement(dialect_name, table, key), rows)
+
+
+def _repair(db: Session, table, key: str, group_column, now) -> int:
+    stored = dict(db.execute(
+        select(table.c[key], table.c.total_quantity).order_by(table.c[key]).with_for_update()
+    ).all())
+    actual = dict(db.execute(
+        select(group_column, func.coalesce(func.sum(inventory_table.c.quantity), 0)).group_by(group_column)
+    ).all())
+
+    drifted = [k for k in sorted(stored.keys() | actual.keys()) if stored.get(k) != actual.get(k, 0)]
+    for k in drifted:
+        if k in stored:
+            db.execute(table.update().where(table.c[key] == k).values(total_quantity=actual.get(k, 0), updated_at=now))
+        else:
+            db.execute(table.insert().values({key: k, "total_quantity": actual[k], "updated_at": now}))
+    return len(drifted)
+
+
+def reconcile_stock_summaries(db: Session) -> dict:
+    """
+    Recompute both summaries from inventory and fix rows that drifted.
+
+    The summary rows are locked first, so writers wait for the repair
+    instead of racing it; inventory itself is only read.
+    """
+    now = datetime.utcnow()
+    repaired = {
+        "products": _repair(db, product_stock, "product_id", inventory_table.c.product_id, now),
+        "warehouses": _repair(db, warehouse_stock, "warehouse_id", inventory_table.c.warehouse_id, now),
+    }
+    db.commit()
+    return repaired
+
+
+class StockReconciler:
+    """Background thread that runs reconcile_stock_summaries every `interval` seconds."""
+
+    def __init__(self, interval=RECONCILE_INTERVAL):
+        self.interval = interval
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stock-summary-reconciler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stopping.wait(self.interval):
+            try:
+                with SessionLocal() as db:
+                    repaired = reconcile_stock_summaries(db)
+                if any(repaired.values()):
+                    logger.warning("Stock summary drift repaired: %s", repaired)
+            except Exception:
+                logger.exception("Stock summary reconciliation failed")
+
+    def stop(self):
+        self._stopping.set()
+        self._thread.join(5)
+
+
+_reconciler = None
+
+
+def start_reconciler():
+    global _reconciler
+    if RECONCILE_INTERVAL > 0:
+        _reconciler = StockReconciler().start()
+    return _reconciler
+
+
+def stop_reconciler():
+    global _reconciler
+    if _reconciler is not None:
+        _reconciler.stop()
+        _reconciler = None
@@ -0,0 +1,157 @@
+"""
+Shared pieces of the offline benchmark suite: environment defaults,
+database seeding, timing statistics and the JSON result file.
+
+Every suite writes one JSON document:
+
+    {"suite": ..., "meta": {...}, "results": {name: {metric: value}}}
+
+Metric names carry their direction so benchmarks/compare.py can diff two
+runs: *_ms / *_us / *_bytes and the statements / queries / errors counts
+are lower-is-better, *_per_s is higher-is-better, anything else (max_*
+included) is informational.
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Set before the app is imported: no broker, no background repair job
+OFFLINE_ENV = {
+    "SERVICE_BUS_TRANSPORT": "memory",
+    "STOCK_RECONCILE_INTERVAL": "0",
+}
+
+# Settings that change what a run measures; recorded with every result
+TRACKED_ENV = (
+    "DATABASE_MODE", "FAST_RESPONSES", "BCRYPT_ROUNDS", "PASSWORD_HASH_WORKERS",
+    "CATALOG_CACHE_ENABLED", "DB_POOL_SIZE", "DB_MAX_OVERFLOW", "ORDER_EVENT_ENCODING", "REQUEST_METRICS_ENABLED",
+)
+
+
+def configure_environment(database_url=None) -> str:
+    """
+    Point the app at `database_url` (default: a fresh SQLite file in the
+    temp directory) with in-memory stand-ins for Azure. Must run before
+    anything under app/ is imported, since app.db reads DATABASE_URL then.
+    """
+    if database_url is None:
+        path = os.path.join(tempfile.mkdtemp(prefix="smart-inventory-bench-"), "bench.sqlite")
+        database_url = f"sqlite:///{path}"
+    os.environ["DATABASE_URL"] = database_url
+    for key, value in OFFLINE_ENV.items():
+        os.environ.setdefault(key, value)
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    return database_url
+
+
+def seed_catalog(engine, products=2000, warehouses=10, suppliers=20, quantity=1_000_000):
+    """
+    Create the schema and fill suppliers, products, warehouses and one
+    inventory row per (product, warehouse), with primary keys 1..n so the
+    load generator can address rows without asking the API first.
+    """
+    from sqlalchemy import insert
+    from app import models
+    from app.db import Base
+
+    Base.metadata.create_all(engine)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(insert(models.Supplier.__table__), [
+            {"supplier_id": s, "name": f"Supplier {s}", "region": f"region-{s % 4}"}
+            for s in range(1, suppliers + 1)
+        ])
+        conn.execute(insert(models.Warehouse.__table__), [
+            {"warehouse_id": w, "code": f"WH{w:03d}", "name": f"Warehouse {w}", "capacity": quantity * products,
+             "region": f"region-{w % 4}"}
+            for w in range(1, warehouses + 1)
+        ])
+        conn.execute(insert(models.Product.__table__), [
+            {"product_id": p, "sku": f"SKU-{p:06d}", "name": f"Product {p}", "category": f"cat-{p % 25}",
+             "price": f"{1 + p % 97}.{p % 100:02d}", "supplier_id": 1 + p % suppliers}
+            for p in range(1, products + 1)
+        ])
+        conn.execute(insert(models.Inventory.__table__), [
+            {"inventory_id": (p - 1) * warehouses + w, "product_id": p, "warehouse_id": w,
+             "quantity": quantity, "last_updated": now}
+            for p in range(1, products + 1) for w in range(1, warehouses + 1)
+        ])
+        conn.execute(insert(models.ProductStock.__table__), [
+            {"product_id": p, "total_quantity": quantity * warehouses, "updated_at": now}
+            for p in range(1, products + 1)
+        ])
+        conn.execute(insert(models.WarehouseStock.__table__), [
+            {"warehouse_id": w, "total_quantity": quantity * products, "updated_at": now}
+            for w in range(1, warehouses + 1)
+        ])
+    return {"products": products, "warehouses": warehouses, "suppliers": suppliers,
+            "inventory_rows": products * warehouses}
+
+
+def latency_stats(seconds, elapsed=None) -> dict:
+    """p50/p95/p99/mean/max in ms for a list of durations, plus a rate over `elapsed`."""
+    samples = np.asarray(seconds, dtype=np.float64) * 1000
+    stats = {}
+    if elapsed:
+        stats["requests_per_s"] = round(len(samples) / elapsed, 2)
+    if len(samples):
+        p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+        stats.update({
+            "p50_ms": round(float(p50), 3),
+            "p95_ms": round(float(p95), 3),
+            "p99_ms": round(float(p99), 3),
+            "mean_ms": round(float(samples.mean()), 3),
+            "max_ms": round(float(samples.max()), 3),
+        })
+    return stats
+
+
+def time_call(fn, repeat=5, number=1):
+    """Best-of-`repeat` seconds for `number` calls of fn(); best filters scheduler noise."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+            capture_output=True, text=True, timeout=10,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_metadata(**config) -> dict:
+    return {
+        "commit": _git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "env": {key: os.environ[key] for key in TRACKED_ENV if key in os.environ},
+        "config": config,
+    }
+
+
+def write_results(path, suite: str, meta: dict, results: dict):
+    document = {"suite": suite, "meta": meta, "results": results}
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+        f.write("\n")
+    print(f"📝 {suite} results written to {path}")
+    return document
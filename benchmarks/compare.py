@@ -0,0 +1,101 @@
+"""
+Diff two benchmark result files (loadtest or micro) and flag regressions.
+
+    python -m benchmarks.compare baseline.json candidate.json --threshold 10
+
+Timings (*_ms, *_us) and sizes (*_bytes) regress when they grow by more
+than --threshold percent, rates (*_per_s) when they drop by more than
+that. Statement, query and error counts regress on any increase. Maxima
+and other numbers are listed with --all but never fail the run. Exits
+with status 1 when anything regressed.
+"""
+import argparse
+import json
+import sys
+
+EXACT_METRICS = ("statements", "queries", "errors")
+
+
+def direction(metric: str):
+    """'lower', 'higher', 'exact' (lower, no tolerance) or None for informational metrics."""
+    if metric in EXACT_METRICS:
+        return "exact"
+    if metric.startswith("max_"):
+        return None  # one sample; too noisy to gate on
+    if metric.endswith(("_ms", "_us", "_bytes")):
+        return "lower"
+    if metric.endswith("_per_s"):
+        return "higher"
+    return None
+
+
+def _numeric(results: dict):
+    return {
+        (name, metric): value
+        for name, metrics in results.items()
+        for metric, value in metrics.items()
+        if isinstance(value, (int, float)) and not isinstance(value, bool)
+    }
+
+
+def compare(baseline: dict, candidate: dict, threshold: float):
+    """[(name, metric, old, new, change %, verdict)] for every metric present in both runs."""
+    old, new = _numeric(baseline["results"]), _numeric(candidate["results"])
+    rows = []
+    for key in sorted(old.keys() & new.keys()):
+        before, after = old[key], new[key]
+        change = (after - before) / before * 100 if before else (0.0 if after == before else float("inf"))
+        kind = direction(key[1])
+        if kind == "exact":
+            verdict = "regressed" if after > before else ("improved" if after < before else "")
+        elif kind == "lower":
+            verdict = "regressed" if change > threshold else ("improved" if change < -threshold else "")
+        elif kind == "higher":
+            verdict = "regressed" if change < -threshold else ("improved" if change > threshold else "")
+        else:
+            verdict = ""
+        rows.append((key[0], key[1], before, after, change, verdict))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10, help="percent change tolerated for timings and rates")
+    parser.add_argument("--all", action="store_true", help="list unchanged metrics too")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    if baseline.get("suite") != candidate.get("suite"):
+        print(f"⚠️ Comparing different suites: {baseline.get('suite')} vs {candidate.get('suite')}")
+    for section in ("env", "config"):
+        if baseline["meta"].get(section) != candidate["meta"].get(section):
+            print(f"⚠️ Runs differ in {section}: {baseline['meta'].get(section)} vs {candidate['meta'].get(section)}")
+
+    rows = compare(baseline, candidate, args.threshold)
+    print(f"{baseline['meta'].get('commit')} -> {candidate['meta'].get('commit')}")
+    for name, metric, before, after, change, verdict in rows:
+        if verdict or args.all:
+            marker = {"regressed": "❌", "improved": "✅"}.get(verdict, "  ")
+            print(f"{marker} {name:50s} {metric:16s} {before:>12g} -> {after:<12g} {change:+.1f}%")
+
+    only_old = sorted(set(baseline["results"]) - set(candidate["results"]))
+    only_new = sorted(set(candidate["results"]) - set(baseline["results"]))
+    if only_old:
+        print(f"Only in baseline: {', '.join(only_old)}")
+    if only_new:
+        print(f"Only in candidate: {', '.join(only_new)}")
+
+    regressions = [row for row in rows if row[5] == "regressed"]
+    print(f"{len(regressions)} regression(s) beyond {args.threshold:g}%")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
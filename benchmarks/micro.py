@@ -0,0 +1,630 @@
+"""
+Micro-benchmarks for the hot paths of the API and the order processor,
+run offline against SQLite (or --database-url) with in-memory stand-ins
+for Service Bus and Blob Storage.
+
+    python -m benchmarks.micro --output micro.json
+    python -m benchmarks.micro --only serialization,allocation
+
+  codec           order event encode/decode: msgpack vs JSON vs legacy str(dict)
+  serialization   every response schema: FastAPI validation vs the FAST_RESPONSES path
+  request_metrics per-request cost of the metrics middleware and /metrics render time
+  token_cache     verify_token on a cached token vs a plain jwt.decode, plus the role check
+  reorder         reorder-point computation over a synthetic --pairs snapshot
+  allocation      split-order planning for hundreds of lines across dozens of warehouses, plus plan checks
+  order_reads     GET /orders pages: statements per page must not grow with page size
+  index_plans     EXPLAIN of the inventory by-warehouse / by-product pages: must seek their index
+  invoice         PDF render time per order size
+  confirm         confirm_order batch: statements, throughput and content-hash skips
+
+Checks that guard behaviour (constant statements per order page, index
+seeks for the inventory lookups, a fixed statement count per confirm batch
+and nothing re-rendered on redelivery, metrics middleware within its
+per-request budget, cached tokens cheaper than decoding, allocation plans
+that fill the order in the fewest shipments) make the run exit with status 1
+when they fail, after the results are written.
+"""
+import argparse
+import sys
+import time
+import types
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Union, get_args, get_origin
+from benchmarks.common import ROOT, configure_environment, latency_stats, run_metadata, seed_catalog, time_call, write_results
+
+ORDER_PROCESSOR = f"{ROOT}/order_processor"
+
+
+def _order_event(lines=20):
+    return {
+        "order_id": 12345, "warehouse_id": 3, "status": "reserved",
+        "items": [{"product_id": 1000 + i, "quantity": 1 + i % 4, "price": 19.99} for i in range(lines)],
+    }
+
+
+# =========================================================
+# Order event codec
+# =========================================================
+def bench_codec(args, checks):
+    from order_processor import event_codec
+
+    event = _order_event()
+    results = {}
+    original = event_codec.ENCODING
+    try:
+        for encoding in ("msgpack", "json"):
+            event_codec.ENCODING = encoding
+            body = event_codec.encode_event(event)
+            results[f"codec.{encoding}"] = {
+                "encode_us": round(time_call(lambda: event_codec.encode_event(event), number=2000) * 1e6, 3),
+                "decode_us": round(time_call(lambda: event_codec.decode_event(body), number=2000) * 1e6, 3),
+                "size_bytes": len(body),
+            }
+    finally:
+        event_codec.ENCODING = original
+    legacy = str(event).encode()
+    results["codec.legacy_str"] = {
+        "decode_us": round(time_call(lambda: event_codec.decode_event(legacy), number=200) * 1e6, 3),
+        "size_bytes": len(legacy),
+    }
+    return results
+
+
+# =========================================================
+# Response serialization per schema
+# =========================================================
+def _sample_value(annotation, i, orm):
+    if get_origin(annotation) in (Union, types.UnionType):
+        annotation = next(a for a in get_args(annotation) if a is not type(None))
+    if get_origin(annotation) is list:
+        return [_sample_value(get_args(annotation)[0], i * 10 + k, orm) for k in range(3)]
+    from pydantic import BaseModel
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return _sample_row(annotation, i, orm)
+    if annotation is int:
+        return i + 1  # ids and quantities are positive
+    if annotation is float:
+        # DECIMAL columns come back as Decimal; routes that build dicts use float
+        return Decimal(f"{i % 1000}.25") if orm else i % 1000 + 0.25
+    if annotation is str:
+        return f"value-{i}"
+    if annotation is datetime:
+        return datetime(2026, 1, 1) + timedelta(seconds=i)
+    raise TypeError(f"No sample value for {annotation}")
+
+
+def _sample_row(schema, i, orm):
+    values = {name: _sample_value(field.annotation, i, orm) for name, field in schema.model_fields.items()}
+    return types.SimpleNamespace(**values) if orm else values
+
+
+def response_schemas():
+    """Every schema a route responds with: the *Out models plus the dict-built results."""
+    from pydantic import BaseModel
+    from app import schemas
+
+    return [
+        value for name, value in vars(schemas).items()
+        if isinstance(value, type) and issubclass(value, BaseModel) and value.__module__ == schemas.__name__
+        and name.endswith(("Out", "Result", "Suggestion"))
+    ]
+
+
+def bench_serialization(args, checks):
+    from pydantic import TypeAdapter
+    from app.responses import dump
+
+    results = {}
+    for schema in response_schemas():
+        # ORM-backed schemas are returned as model objects, the rest as dicts
+        orm = bool(schema.model_config.get("from_attributes"))
+        rows = [_sample_row(schema, i, orm) for i in range(args.rows)]
+        adapter = TypeAdapter(list[schema])
+        default = time_call(lambda: adapter.dump_json(adapter.validate_python(rows, from_attributes=orm)))
+        fast = time_call(lambda: dump(rows, schema))
+        results[f"serialization.{schema.__name__}"] = {
+            "rows": args.rows,
+            "fastapi_ms": round(default * 1000, 3),
+            "fast_ms": round(fast * 1000, 3),
+            "speedup": round(default / fast, 2),
+        }
+    return results
+
+
+# =========================================================
+# Request metrics middleware
+# =========================================================
+def bench_request_metrics(args, checks):
+    import asyncio
+    from app import prometheus, request_metrics
+
+    route = types.SimpleNamespace(path="/bench/{item_id}")
+    start_message = {"type": "http.response.start", "status": 200, "headers": []}
+    body_message = {"type": "http.response.body", "body": b"{}"}
+
+    async def endpoint(scope, receive, send):
+        scope["route"] = route  # as the router does on a match
+        await send(start_message)
+        await send(body_message)
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    def serve(app):
+        async def requests():
+            for _ in range(args.requests):
+                await app({"type": "http", "method": "GET", "path": "/bench/1"}, receive, send)
+        loop.run_until_complete(requests())
+
+    loop = asyncio.new_event_loop()
+    try:
+        bare = time_call(lambda: serve(endpoint)) / args.requests
+        metered = time_call(lambda: serve(request_metrics.RequestMetricsMiddleware(endpoint))) / args.requests
+    finally:
+        loop.close()
+    overhead_us = (metered - bare) * 1e6
+    results = {"request_metrics.middleware": {
+        "requests": args.requests,
+        "bare_us": round(bare * 1e6, 3),
+        "metered_us": round(metered * 1e6, 3),
+        "overhead_us": round(overhead_us, 3),
+    }}
+    if overhead_us > args.metrics_budget_us:
+        checks.append(f"request_metrics: {overhead_us:.2f} us per request, budget {args.metrics_budget_us:g} us")
+
+    # A scrape of an API-sized registry: every route hit with a few status codes
+    for i in range(60):
+        metrics = request_metrics.routes.setdefault(("GET", f"/bench/{i}/{{item_id}}"), request_metrics.RouteMetrics())
+        for status in (200, 404, 500):
+            metrics.observe(status, 0.001 * (i % 20))
+    results["request_metrics.render"] = {
+        "series": len(request_metrics.routes),
+        "render_ms": round(time_call(prometheus.render, number=20) * 1000, 3),
+    }
+    return results
+
+
+# =========================================================
+# Verified-token cache
+# =========================================================
+def bench_token_cache(args, checks):
+    from jose import jwt
+    from app import auth
+
+    token = auth.create_access_token({"sub": "warehouse", "role": "warehouse"})
+    role_check = auth.require_role("admin", "warehouse")
+
+    def uncached():
+        auth.token_cache.clear()
+        return auth.verify_token(token)
+
+    decode = time_call(lambda: jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM]), number=2000)
+    miss = time_call(uncached, number=2000)
+    auth.verify_token(token)
+    hit = time_call(lambda: auth.verify_token(token), number=20000)
+    payload = auth.verify_token(token)
+    results = {
+        "token_cache.verify": {
+            "jwt_decode_us": round(decode * 1e6, 3),
+            "verify_miss_us": round(miss * 1e6, 3),
+            "verify_hit_us": round(hit * 1e6, 3),
+            "speedup": round(decode / hit, 2),
+        },
+        "token_cache.role_check": {
+            "role_check_us": round(time_call(lambda: role_check(payload), number=20000) * 1e6, 3),
+        },
+    }
+    auth.token_cache.clear()
+    if hit >= decode:
+        checks.append(f"token_cache: cached verify_token ({hit * 1e6:.2f} us) is no faster than jwt.decode ({decode * 1e6:.2f} us)")
+    return results
+
+
+# =========================================================
+# Reorder engine
+# =========================================================
+def bench_reorder(args, checks):
+    import numpy as np
+    from app.services.reorder import StockSnapshot, compute_reorder, reorder_candidates
+
+    n = args.pairs
+    rng = np.random.default_rng(7)
+    sold = rng.integers(0, 300, n).astype(np.float64) * (rng.random(n) < 0.6)
+    snapshot = StockSnapshot(np.arange(n) // 20 + 1, np.arange(n) % 20 + 1, rng.integers(0, 500, n), sold, 30)
+    metrics = compute_reorder(snapshot)
+    return {"reorder": {
+        "pairs": n,
+        "compute_ms": round(time_call(lambda: compute_reorder(snapshot)) * 1000, 3),
+        "candidates_ms": round(time_call(lambda: reorder_candidates(snapshot, metrics, limit=1000)) * 1000, 3),
+    }}
+
+
+# =========================================================
+# Split-order allocation
+# =========================================================
+# (stock per warehouse 1..n, units requested, home warehouse, expected shipments, expected plan or None)
+ALLOCATION_CASES = {
+    "home_short": ([7, 10, 10], 20, 1, 2, None),
+    "home_covers": ([10, 10], 10, 2, 1, {2: {1: 10}}),
+    "home_empty": ([0, 5], 5, 1, 1, {2: {1: 5}}),
+    "one_full_warehouse": ([4, 4, 12], 12, 1, 1, {3: {1: 12}}),
+}
+
+
+def _check_plan(name, plan, matrix, warehouse_ids, product_ids, requested, checks):
+    """The plan ships exactly what was requested and no warehouse more than it holds."""
+    if plan is None:
+        checks.append(f"{name}: no plan for an order the network can fill")
+        return
+    row = {int(w): i for i, w in enumerate(warehouse_ids)}
+    shipped = dict.fromkeys(product_ids, 0)
+    for warehouse_id, shipment in plan.items():
+        for product_id, quantity in shipment.items():
+            if quantity > matrix[row[warehouse_id], product_ids.index(product_id)]:
+                checks.append(f"{name}: warehouse {warehouse_id} ships {quantity} of product {product_id}, more than it holds")
+            shipped[product_id] += quantity
+    short = {p: requested[p] - shipped[p] for p in product_ids if shipped[p] != requested[p]}
+    if short:
+        checks.append(f"{name}: shipped quantities differ from the order by {short}")
+
+
+def bench_allocation(args, checks):
+    import numpy as np
+    from app.services.allocation import Availability, plan_allocation
+
+    results = {}
+    for case, (stock, units, home, shipments, expected) in ALLOCATION_CASES.items():
+        warehouse_ids = np.arange(1, len(stock) + 1)
+        matrix = np.array([[q] for q in stock], dtype=np.int64)
+        availability = Availability(warehouse_ids, ["region-1"] * len(stock), [1], matrix)
+        plan = plan_allocation(availability, {1: units}, home, "region-1")
+        name = f"allocation.{case}"
+        _check_plan(name, plan, matrix, warehouse_ids, [1], {1: units}, checks)
+        if plan is not None and len(plan) != shipments:
+            checks.append(f"{name}: {len(plan)} shipments, expected {shipments}: {plan}")
+        if expected is not None and plan != expected:
+            checks.append(f"{name}: plan {plan}, expected {expected}")
+        results[name] = {"shipments": None if plan is None else len(plan), "plan": plan}
+
+    for lines, warehouses in ((10, 5), (100, 20), (300, 40)):
+        rng = np.random.default_rng(lines)
+        # Each warehouse stocks about half the catalog, so most orders need several
+        matrix = rng.integers(0, 60, (warehouses, lines)) * (rng.random((warehouses, lines)) < 0.5)
+        availability = Availability(
+            np.arange(1, warehouses + 1), [f"region-{w % 4}" for w in range(warehouses)],
+            list(range(1, lines + 1)), matrix,
+        )
+        requested = {p: int(q) for p, q in zip(range(1, lines + 1), rng.integers(1, 40, lines))}
+        samples = []
+        for _ in range(200):
+            start = time.perf_counter()
+            plan = plan_allocation(availability, requested, 1, "region-1")
+            samples.append(time.perf_counter() - start)
+        name = f"allocation.{lines}_lines_{warehouses}_warehouses"
+        if (matrix.sum(axis=0) >= list(requested.values())).all():
+            _check_plan(name, plan, matrix, availability.warehouse_ids, availability.product_ids, requested, checks)
+        results[name] = {
+            "shipments": None if plan is None else len(plan),
+            **latency_stats(samples),
+        }
+    return results
+
+
+# =========================================================
+# Order reads (statement count per page)
+# =========================================================
+def _statement_counter(engine):
+    from sqlalchemy import event
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *rest: statements.append(statement))
+    return statements
+
+
+def _seed_orders(engine, orders, items_per_order, products, warehouses):
+    from sqlalchemy import insert
+    from app import models
+
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(insert(models.Order.__table__), [
+            {"order_id": o, "warehouse_id": 1 + o % warehouses, "status": models.OrderStatus.reserved,
+             "created_at": now, "updated_at": now}
+            for o in range(1, orders + 1)
+        ])
+        conn.execute(insert(models.OrderItem.__table__), [
+            {"order_id": o, "product_id": 1 + (o * 7 + k) % products, "quantity": 1 + k, "price": "9.99"}
+            for o in range(1, orders + 1) for k in range(items_per_order)
+        ])
+
+
+def bench_order_reads(args, checks):
+    from fastapi.testclient import TestClient
+    from app import db as app_db
+    from app.auth import create_access_token
+    from app.main import app
+
+    # No lifespan: no relay or reconciler threads adding their own statements
+    client = TestClient(app)
+    headers = {"Authorization": "Bearer " + create_access_token({"sub": "bench", "role": "warehouse"})}
+    engine = app_db.async_engine.sync_engine if app_db.ASYNC_MODE else app_db.engine
+    statements = _statement_counter(engine)
+
+    results = {}
+    per_page = {}
+    for path in ("/orders/?limit=5", "/orders/?limit=50", "/orders/?limit=500", "/orders/?limit=500&warehouse_id=2", "/orders/7"):
+        client.get(path, headers=headers)  # warm up
+        samples = []
+        for _ in range(20):
+            statements.clear()
+            start = time.perf_counter()
+            response = client.get(path, headers=headers)
+            samples.append(time.perf_counter() - start)
+            response.raise_for_status()
+        body = response.json()
+        per_page[path] = len(statements)
+        results[f"order_reads.{path}"] = {
+            "orders": len(body) if isinstance(body, list) else 1,
+            "queries": len(statements),
+            **latency_stats(samples),
+        }
+    if len(set(per_page.values())) != 1:
+        checks.append(f"order_reads: statements per request vary with page size: {per_page}")
+    return results
+
+
+# =========================================================
+# Inventory index plans
+# =========================================================
+def _plan(db, statement):
+    """(indexes used on inventory, full scan?, plan text) from the dialect's EXPLAIN."""
+    from sqlalchemy import text
+
+    bind = db.get_bind()
+    sql = str(statement.compile(bind, compile_kwargs={"literal_binds": True}))
+    if bind.dialect.name == "sqlite":
+        details = [r.detail for r in db.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+        steps = [d for d in details if " inventory " in f"{d} "]
+        indexes = {d.split(" INDEX ", 1)[1].split()[0] for d in steps if " INDEX " in d}
+        full_scan = any(d.startswith("SCAN") and " INDEX " not in d for d in steps)
+        return indexes, full_scan, "; ".join(details)
+    rows = [dict(r) for r in db.execute(text(f"EXPLAIN {sql}")).mappings()]
+    steps = [r for r in rows if r.get("table") == "inventory"]
+    indexes = {r["key"] for r in steps if r.get("key")}
+    full_scan = any(r.get("type") == "ALL" for r in steps)
+    return indexes, full_scan, "; ".join(f"{r.get('table')}: {r.get('type')} {r.get('key')}" for r in rows)
+
+
+def bench_index_plans(args, checks):
+    from sqlalchemy.orm import Session
+    from app import db as app_db, models
+    from app.pagination import DEFAULT_PAGE_SIZE, _keyset_query
+
+    inventory = models.Inventory
+    # routes/inventory.py inventory_by_warehouse / inventory_by_product
+    lookups = {
+        "inventory_by_warehouse": ([inventory.warehouse_id == 3], "ix_inventory_warehouse_product_qty"),
+        "inventory_by_product": ([inventory.product_id == 17], "uq_inventory_product_warehouse"),
+    }
+    results = {}
+    with Session(app_db.engine) as db:
+        for name, (criteria, expected) in lookups.items():
+            for page, after in (("first_page", None), ("next_page", 500)):
+                query = _keyset_query(db, inventory, inventory.inventory_id, after, criteria).limit(DEFAULT_PAGE_SIZE)
+                indexes, full_scan, plan = _plan(db, query.statement)
+                key = f"index_plans.{name}.{page}"
+                results[key] = {
+                    "index": ",".join(sorted(indexes)) or None,
+                    "full_scan": full_scan,
+                    "plan": plan,
+                    "page_ms": round(time_call(query.all, number=20) * 1000, 3),
+                }
+                if expected not in indexes or full_scan:
+                    checks.append(f"{key}: expected a seek on {expected}, plan was: {plan}")
+    return results
+
+
+# =========================================================
+# Invoice rendering and order confirmation
+# =========================================================
+def bench_invoice(args, checks):
+    if ORDER_PROCESSOR not in sys.path:
+        sys.path.insert(0, ORDER_PROCESSOR)
+    from invoice import render_invoice
+
+    results = {}
+    for lines in (1, 10, 50):
+        items = [{"product_id": 100 + i, "quantity": 2, "price": Decimal("12.50")} for i in range(lines)]
+        seconds = time_call(lambda: render_invoice(1, 1, items), number=5)
+        results[f"invoice.render_{lines}_lines"] = {
+            "render_ms": round(seconds * 1000, 3),
+            "size_bytes": len(render_invoice(1, 1, items)),
+        }
+    return results
+
+
+class InMemoryBlobService:
+    """Blob Storage stand-in: keeps bodies and metadata in a dict, with a fixed per-call latency."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.blobs = {}
+        self.uploads = 0
+
+    def get_blob_client(self, container, blob):
+        return InMemoryBlob(self, f"{container}/{blob}")
+
+
+class InMemoryBlob:
+    def __init__(self, service, name):
+        self.service = service
+        self.name = name
+        self.url = f"memory://{name}"
+
+    def get_blob_properties(self):
+        from azure.core.exceptions import ResourceNotFoundError
+
+        time.sleep(self.service.latency)
+        if self.name not in self.service.blobs:
+            raise ResourceNotFoundError(f"{self.name} not found")
+        return types.SimpleNamespace(metadata=self.service.blobs[self.name][1])
+
+    def upload_blob(self, data, overwrite=False, metadata=None):
+        time.sleep(self.service.latency)
+        self.service.blobs[self.name] = (data.read(), dict(metadata or {}))
+        self.service.uploads += 1
+
+
+class _Message:
+    message_id = "bench"
+
+    def __init__(self, body):
+        self.body = body
+
+    def get_body(self):
+        return self.body
+
+
+# Statements per confirm_order batch, whatever its size: the confirming
+# UPDATE, one SELECT of the orders joined to their items, and the invoice
+# URL UPDATE when anything was uploaded or found by hash
+CONFIRM_STATEMENTS = {"confirm.first_delivery": 3, "confirm.redelivery": 2, "confirm.unchanged_hash": 3}
+
+
+def bench_confirm(args, checks):
+    from sqlalchemy import insert, text
+    from app import db as app_db, models
+
+    if ORDER_PROCESSOR not in sys.path:
+        sys.path.insert(0, ORDER_PROCESSOR)
+    import function_app
+    from event_codec import encode_event
+
+    engine = app_db.engine
+    blobs = InMemoryBlobService(args.blob_latency_ms / 1000)
+    function_app.engine = engine
+    function_app._blob_service_client = blobs
+
+    # Laid out as production writes it: the API's order owns the items,
+    # process_order adds its own row keyed by the API order id, without items
+    first_id = 1_000_000
+    ids = range(first_id, first_id + args.orders)
+    with engine.begin() as conn:
+        conn.execute(insert(models.Order.__table__), [
+            {"order_id": o, "warehouse_id": 1, "status": models.OrderStatus.reserved} for o in ids
+        ])
+        conn.execute(insert(models.OrderItem.__table__), [
+            {"order_id": o, "product_id": 1 + k, "quantity": 1 + k, "price": "24.50"} for o in ids for k in range(5)
+        ])
+        conn.execute(insert(models.Order.__table__), [
+            {"order_id": o + args.orders, "ext_order_id": str(o), "warehouse_id": 1, "status": models.OrderStatus.created}
+            for o in ids
+        ])
+    messages = [_Message(encode_event({"order_id": o})) for o in ids]
+    statements = _statement_counter(engine)
+
+    def delivery():
+        statements.clear()
+        uploads = blobs.uploads
+        start = time.perf_counter()
+        function_app.confirm_order(messages)
+        seconds = time.perf_counter() - start
+        return {
+            "orders": args.orders,
+            "statements": len(statements),
+            "uploads": blobs.uploads - uploads,
+            "wall_ms": round(seconds * 1000, 3),
+            "orders_per_s": round(args.orders / seconds, 2),
+        }
+
+    results = {"confirm.first_delivery": delivery(), "confirm.redelivery": delivery()}
+    # Same order data with the stored invoice URL lost: every PDF is found by hash
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE orders SET invoice_blob = NULL WHERE order_id >= :first"), {"first": first_id})
+    results["confirm.unchanged_hash"] = delivery()
+
+    # Every invoice must have been rendered from the order's lines
+    with engine.connect() as conn:
+        found = function_app.confirm_and_load(conn, list(ids))
+    without_items = [oid for oid, (_, items) in found.items() if len(items) != 5]
+    if len(found) != args.orders or without_items:
+        checks.append(f"confirm: {len(without_items)} of {len(found)} orders loaded without their items")
+
+    render_pool, upload_pool = function_app.get_invoice_pools()
+    render_pool.shutdown()
+    upload_pool.shutdown()
+
+    if results["confirm.first_delivery"]["uploads"] != args.orders:
+        checks.append(f"confirm: first delivery uploaded {results['confirm.first_delivery']['uploads']} of {args.orders} invoices")
+    for name in ("confirm.redelivery", "confirm.unchanged_hash"):
+        if results[name]["uploads"]:
+            checks.append(f"{name}: {results[name]['uploads']} invoices re-uploaded")
+    for name, expected in CONFIRM_STATEMENTS.items():
+        if results[name]["statements"] != expected:
+            checks.append(f"{name}: {results[name]['statements']} statements per batch, expected {expected}")
+    return results
+
+
+BENCHMARKS = {
+    "codec": bench_codec,
+    "serialization": bench_serialization,
+    "request_metrics": bench_request_metrics,
+    "token_cache": bench_token_cache,
+    "reorder": bench_reorder,
+    "allocation": bench_allocation,
+    "order_reads": bench_order_reads,
+    "index_plans": bench_index_plans,
+    "invoice": bench_invoice,
+    "confirm": bench_confirm,
+}
+# Need the seeded database
+DATABASE_BENCHMARKS = {"order_reads", "index_plans", "confirm"}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--only", help=f"comma-separated subset of: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--rows", type=int, default=1000, help="rows per serialization run")
+    parser.add_argument("--requests", type=int, default=20000, help="requests per middleware timing run")
+    parser.add_argument("--metrics-budget-us", type=float, default=5, help="allowed middleware cost per request")
+    parser.add_argument("--pairs", type=int, default=1_000_000, help="(product, warehouse) pairs for reorder")
+    parser.add_argument("--orders", type=int, default=200, help="orders per confirm_order batch")
+    parser.add_argument("--blob-latency-ms", type=float, default=20, help="simulated Blob Storage round trip")
+    parser.add_argument("--database-url", help="empty database to seed (default: temporary SQLite file)")
+    parser.add_argument("--output", default="micro-results.json")
+    args = parser.parse_args(argv)
+
+    selected = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = set(selected) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    database_url = configure_environment(args.database_url)
+    catalog = None
+    if DATABASE_BENCHMARKS & set(selected):
+        from app.db import engine
+        catalog = seed_catalog(engine, products=200, warehouses=5)
+        _seed_orders(engine, orders=2000, items_per_order=5, products=200, warehouses=5)
+
+    results, checks = {}, []
+    for name in selected:
+        print(f"⏱️  {name}")
+        results.update(BENCHMARKS[name](args, checks))
+
+    meta = run_metadata(
+        database=database_url.split(":", 1)[0], benchmarks=selected, rows=args.rows, requests=args.requests, pairs=args.pairs,
+        orders=args.orders, blob_latency_ms=args.blob_latency_ms, catalog=catalog,
+    )
+    write_results(args.output, "micro", meta, results)
+    for failure in checks:
+        print(f"❌ {failure}")
+    if checks:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
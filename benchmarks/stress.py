@@ -0,0 +1,256 @@
+"""
+Reservation stress test: concurrent create_order, split orders and bulk
+inventory upserts hammering the same few inventory rows, followed by
+consistency checks on the database.
+
+    python -m benchmarks.stress --mysql --concurrency 32 --duration 20
+
+Runs two phases against the real app under uvicorn:
+
+  reservations  create_order, POST /orders/split and DELETE /orders/{id}
+                of orders placed earlier in the run. Afterwards every
+                (product, warehouse) must hold exactly its seeded quantity
+                minus the units of the orders still reserved there.
+  mixed         the same plus POST /inventory/bulk restocks on the same
+                rows, in random row order.
+
+After each phase no inventory row may be negative (oversell), and
+product_stock / warehouse_stock must equal the sums over inventory. Any
+5xx or transport error fails the run: a deadlock surfaces as a 500. Exits
+with status 1 when a check fails, after the results are written.
+
+Row locks only exist on MySQL (--mysql or --database-url); SQLite
+serializes writers on the database lock, so there the run checks the
+bookkeeping but cannot produce a deadlock.
+"""
+import argparse
+import asyncio
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+import httpx
+from benchmarks.common import configure_environment, latency_stats, run_metadata, seed_catalog, write_results
+from benchmarks.loadtest import USERS, _free_port, _login, start_mysql_container, start_server, stop_server, wait_until_ready
+
+PHASES = {
+    "reservations": {"order": 3, "split": 2, "cancel": 1},
+    "mixed": {"order": 3, "split": 2, "cancel": 1, "bulk": 1},
+}
+
+
+class Operations:
+    """Requests that all land on the same products × warehouses grid."""
+
+    def __init__(self, products: int, warehouses: int):
+        self.products = range(1, products + 1)
+        self.warehouses = range(1, warehouses + 1)
+        # Reserved orders placed so far, for cancel to release
+        self.placed = []
+
+    def _items(self, rng, low, high):
+        # Random product order (and the odd repeated SKU) so lock ordering is up to the server
+        chosen = rng.sample(self.products, rng.randint(1, len(self.products)))
+        if rng.random() < 0.2:
+            chosen.append(chosen[0])
+        return [{"product_id": p, "quantity": rng.randint(low, high), "price": 9.99} for p in chosen]
+
+    async def order(self, client, rng, headers):
+        body = {"warehouse_id": rng.choice(self.warehouses), "items": self._items(rng, 1, 5)}
+        response = await client.post("/orders/", json=body, headers=headers)
+        self._placed(response.json() if response.status_code == 200 else {})
+        return response
+
+    async def split(self, client, rng, headers):
+        body = {"warehouse_id": rng.choice(self.warehouses), "items": self._items(rng, 5, 40)}
+        response = await client.post("/orders/split", json=body, headers=headers)
+        for order in response.json()["orders"] if response.status_code == 200 else []:
+            self._placed(order)
+        return response
+
+    def _placed(self, order):
+        if order.get("status") == "reserved":
+            self.placed.append(order["order_id"])
+
+    async def cancel(self, client, rng, headers):
+        if not self.placed:
+            return await self.order(client, rng, headers)
+        order_id = self.placed.pop(rng.randrange(len(self.placed)))
+        return await client.delete(f"/orders/{order_id}", headers=headers)
+
+    async def bulk(self, client, rng, headers):
+        pairs = [(p, w) for p in self.products for w in self.warehouses]
+        rows = [
+            {"product_id": p, "warehouse_id": w, "quantity": rng.randint(0, 60)}
+            for p, w in rng.sample(pairs, rng.randint(1, len(pairs)))
+        ]
+        return await client.post("/inventory/bulk", json=rows, headers=headers)
+
+
+async def drive(base_url, operations: Operations, mix: dict, concurrency: int, duration: float, seed: int):
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    samples = defaultdict(list)
+    statuses = defaultdict(lambda: defaultdict(int))
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        # Cancelling orders takes the admin role
+        headers = await _login(client, USERS[0])
+        deadline = time.perf_counter() + duration
+
+        async def user(index):
+            rng = random.Random(seed * 1000 + index)
+            while time.perf_counter() < deadline:
+                name = rng.choices(names, weights)[0]
+                start = time.perf_counter()
+                try:
+                    status = (await getattr(operations, name)(client, rng, headers)).status_code
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                samples[name].append(time.perf_counter() - start)
+                statuses[name][status] += 1
+
+        await asyncio.gather(*(user(i) for i in range(concurrency)))
+    return samples, statuses
+
+
+# =========================================================
+# Consistency checks
+# =========================================================
+def inventory_state(engine) -> dict:
+    """Quantities, summaries and reserved units as they stand in the database."""
+    from sqlalchemy import func, select
+    from app import models
+
+    inventory = models.Inventory.__table__
+    orders, items = models.Order.__table__, models.OrderItem.__table__
+    with engine.connect() as conn:
+        quantities = {(r.product_id, r.warehouse_id): r.quantity for r in conn.execute(
+            select(inventory.c.product_id, inventory.c.warehouse_id, inventory.c.quantity)
+        )}
+        product_stock = dict(conn.execute(select(
+            models.ProductStock.product_id, models.ProductStock.total_quantity,
+        )).all())
+        warehouse_stock = dict(conn.execute(select(
+            models.WarehouseStock.warehouse_id, models.WarehouseStock.total_quantity,
+        )).all())
+        reserved = {(r.product_id, r.warehouse_id): r.units for r in conn.execute(
+            select(items.c.product_id, orders.c.warehouse_id, func.sum(items.c.quantity).label("units"))
+            .join(orders, orders.c.order_id == items.c.order_id)
+            .where(orders.c.status == models.OrderStatus.reserved)
+            .group_by(items.c.product_id, orders.c.warehouse_id)
+        )}
+        order_counts = dict(conn.execute(
+            select(orders.c.status, func.count()).group_by(orders.c.status)
+        ).all())
+    return {
+        "quantities": quantities, "product_stock": product_stock, "warehouse_stock": warehouse_stock,
+        "reserved": reserved, "orders": {getattr(k, "value", k): v for k, v in order_counts.items()},
+    }
+
+
+def check_state(state: dict, seeded_quantity=None) -> dict:
+    """Counts of each kind of inconsistency; all zero when the phase was clean."""
+    quantities = state["quantities"]
+    by_product, by_warehouse = defaultdict(int), defaultdict(int)
+    for (product_id, warehouse_id), quantity in quantities.items():
+        by_product[product_id] += quantity or 0
+        by_warehouse[warehouse_id] += quantity or 0
+
+    problems = {
+        "negative_rows": sum(1 for q in quantities.values() if (q or 0) < 0),
+        "product_summary_mismatches": sum(
+            1 for k in by_product.keys() | state["product_stock"].keys()
+            if by_product.get(k, 0) != state["product_stock"].get(k, 0)
+        ),
+        "warehouse_summary_mismatches": sum(
+            1 for k in by_warehouse.keys() | state["warehouse_stock"].keys()
+            if by_warehouse.get(k, 0) != state["warehouse_stock"].get(k, 0)
+        ),
+    }
+    if seeded_quantity is not None:
+        problems["conservation_mismatches"] = sum(
+            1 for pair, quantity in quantities.items()
+            if quantity != seeded_quantity - state["reserved"].get(pair, 0)
+        )
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--concurrency", type=int, default=16, help="virtual users")
+    parser.add_argument("--duration", type=float, default=15, help="seconds per phase")
+    parser.add_argument("--products", type=int, default=4, help="hot products every request draws from")
+    parser.add_argument("--warehouses", type=int, default=3, help="hot warehouses every request draws from")
+    parser.add_argument("--quantity", type=int, default=500, help="seeded units per (product, warehouse)")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--database-url", help="empty database to seed (default: temporary SQLite file)")
+    parser.add_argument("--mysql", action="store_true", help="run against a MySQL 8 container started with docker")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default="stress-results.json")
+    args = parser.parse_args(argv)
+
+    container = None
+    database_url = args.database_url
+    if args.mysql:
+        container, database_url = start_mysql_container()
+    results, failures = {}, []
+    try:
+        database_url = configure_environment(database_url)
+        from app.db import engine
+        catalog = seed_catalog(
+            engine, products=args.products, warehouses=args.warehouses, suppliers=1, quantity=args.quantity,
+        )
+        engine.dispose()
+        operations = Operations(args.products, args.warehouses)
+
+        port = _free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        server = start_server(port, args.workers)
+        try:
+            wait_until_ready(base_url, server)
+            for phase, mix in PHASES.items():
+                print(f"🔨 {phase}: {args.concurrency} users for {args.duration:g}s")
+                samples, statuses = asyncio.run(drive(
+                    base_url, operations, mix, args.concurrency, args.duration, args.seed,
+                ))
+                for name in sorted(samples):
+                    errors = sum(
+                        n for status, n in statuses[name].items() if not isinstance(status, int) or status >= 500
+                    )
+                    results[f"{phase}.{name}"] = {
+                        "requests": len(samples[name]),
+                        "errors": errors,
+                        "status_codes": {str(s): n for s, n in sorted(statuses[name].items(), key=str)},
+                        **latency_stats(samples[name], args.duration),
+                    }
+                    if errors:
+                        failures.append(f"{phase}.{name}: {errors} failed requests {dict(statuses[name])}")
+
+                # Only the reservation phase keeps the seeded quantities as a baseline
+                state = inventory_state(engine)
+                problems = check_state(state, args.quantity if phase == "reservations" else None)
+                results[f"{phase}.consistency"] = {**problems, "orders": state["orders"]}
+                failures.extend(f"{phase}: {n} {kind}" for kind, n in problems.items() if n)
+        finally:
+            stop_server(server)
+    finally:
+        if container:
+            subprocess.run(["docker", "rm", "-f", container], capture_output=True)
+
+    meta = run_metadata(
+        database=database_url.split(":", 1)[0], concurrency=args.concurrency, duration=args.duration,
+        workers=args.workers, seed=args.seed, quantity=args.quantity, catalog=catalog,
+    )
+    write_results(args.output, "stress", meta, results)
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        sys.exit(1)
+    print("✅ No failed requests, no oversell, summaries match inventory")
+
+
+if __name__ == "__main__":
+    main()
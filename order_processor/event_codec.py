@@ -0,0 +1,61 @@
+"""
+Wire format for order events on Service Bus, shared by the API publisher
+(app.services.service_bus / app.services.outbox) and the consumers in
+function_app.py. It lives here because the function app is deployed on its
+own; the API imports it as order_processor.event_codec.
+
+A binary body is a 2-byte magic marker, a 1-byte schema version, then the
+event as msgpack. Anything without the marker is an older message: JSON,
+or the str(dict) bodies the first publisher sent.
+"""
+import ast
+import json
+import os
+import msgpack
+
+MAGIC = b"OE"
+SCHEMA_VERSION = 1
+
+# "msgpack" (default) or "json"; switch publishers back to JSON while some
+# consumer still predates this codec
+ENCODING = os.getenv("ORDER_EVENT_ENCODING", "msgpack")
+
+
+class EventDecodeError(ValueError):
+    pass
+
+
+def encode_event(event: dict) -> bytes:
+    """Serialize an order event for Service Bus."""
+    if ENCODING == "json":
+        return json.dumps(event, separators=(",", ":")).encode("utf-8")
+    return MAGIC + bytes([SCHEMA_VERSION]) + msgpack.packb(event, use_bin_type=True)
+
+
+def decode_event(body) -> dict:
+    """Parse a message body in any format a publisher has ever sent."""
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+
+    if body[:2] == MAGIC:
+        version = body[2]
+        if version > SCHEMA_VERSION:
+            raise EventDecodeError(f"Unsupported order event schema version {version}")
+        try:
+            return msgpack.unpackb(body[3:], raw=False)
+        except Exception as e:
+            raise EventDecodeError(f"Corrupt order event: {e}") from e
+
+    text = body.decode("utf-8")
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    try:
+        # Legacy str(dict) body; literal_eval copes with apostrophes in values
+        event = ast.literal_eval(text)
+    except (ValueError, SyntaxError) as e:
+        raise EventDecodeError(f"Unreadable order event: {e}") from e
+    if not isinstance(event, dict):
+        raise EventDecodeError("Order event is not an object")
+    return event
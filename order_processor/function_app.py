@@ -1,13 +1,19 @@
 import azure.functions as func
+import azurefunctions.extensions.bindings.servicebus as servicebus
 import logging
-import json
-from sqlalchemy import create_engine, text
+from typing import List
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+import multiprocessing
+import threading
+from sqlalchemy import bindparam, case, column, create_engine, table, text, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
 import os
 import certifi
-from fpdf import FPDF
+from azure.core.exceptions import ResourceNotFoundError
 from azure.storage.blob import BlobServiceClient
 from io import BytesIO
-from datetime import datetime
+from event_codec import decode_event
+from invoice import InvoiceMetrics, invoice_hash, timed_render
 
 # ==============================
 #   ENVIRONMENT VARIABLES
@@ -18,12 +24,23 @@ BLOB_CONN_STR = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
 ssl_args = {"ssl": {"ca": certifi.where()}}
 engine = create_engine(DATABASE_URL, connect_args=ssl_args, pool_pre_ping=True)
 
-blob_service_client = BlobServiceClient.from_connection_string(BLOB_CONN_STR)
 container_name = "invoices"
-try:
-    blob_service_client.create_container(container_name)
-except Exception:
-    pass  # Already exists
+_blob_service_client = None
+_blob_lock = threading.Lock()
+
+
+def get_blob_service_client():
+    """Created on first use, so importing the app (cold start) makes no storage call."""
+    global _blob_service_client
+    with _blob_lock:
+        if _blob_service_client is None:
+            client = BlobServiceClient.from_connection_string(BLOB_CONN_STR)
+            try:
+                client.create_container(container_name)
+            except Exception:
+                pass  # Already exists
+            _blob_service_client = client
+    return _blob_service_client
 
 # ==============================
 #   FUNCTION APP
@@ -33,189 +50,312 @@ app = func.FunctionApp()
 # ==============================
 #   1️⃣ PROCESS ORDER FUNCTION
 # ==============================
+orders_table = table(
+    "orders",
+    column("order_id"),
+    column("ext_order_id"),
+    column("warehouse_id"),
+    column("status"),
+    column("invoice_blob"),
+)
+
+
+def message_body(msg) -> bytes:
+    """Raw bytes of a received message; the SDK hands the body over as data sections."""
+    body = msg.body
+    return body if isinstance(body, bytes) else b"".join(body)
+
+
+def parse_order_events(msgs):
+    """Decode a batch into {ext_order_id: (row, messages)}, last event per
+    ext_order_id wins, plus [(message, error)] for bodies that can't be decoded."""
+    orders, malformed = {}, []
+    for msg in msgs:
+        try:
+            event = decode_event(message_body(msg))
+            order_id = event["order_id"]
+        except Exception as e:
+            malformed.append((msg, str(e)))
+            continue
+        _, messages = orders.get(order_id, (None, []))
+        orders[order_id] = (
+            {"ext_order_id": order_id, "warehouse_id": event.get("warehouse_id"), "status": "created"},
+            messages + [msg],
+        )
+    return orders, malformed
+
+
+def upsert_orders(conn, rows):
+    """One multi-row INSERT ... ON DUPLICATE KEY UPDATE. A redelivered order
+    keeps its current status instead of being reset to 'created'."""
+    stmt = mysql_insert(orders_table).values(rows)
+    conn.execute(stmt.on_duplicate_key_update(warehouse_id=stmt.inserted.warehouse_id))
+
+
 @app.service_bus_queue_trigger(
-    arg_name="msg",
+    arg_name="msgs",
     queue_name="orders-queue",
-    connection="SERVICE_BUS_CONNECTION_STRING"
+    connection="SERVICE_BUS_CONNECTION_STRING",
+    cardinality=func.Cardinality.MANY,
+    auto_complete_messages=False,
 )
-def process_order(msg: func.ServiceBusMessage):
-    logging.info("📦 Received new order event")
+def process_order(
+    msgs: List[servicebus.ServiceBusReceivedMessage],
+    message_actions: servicebus.ServiceBusMessageActions,
+):
+    """Every message is settled on its own: completed once its order is stored,
+    dead-lettered if its body is unreadable, abandoned if its row failed."""
+    logging.info(f"📦 Received {len(msgs)} order events")
 
-    try:
-        body = msg.get_body().decode("utf-8")
-        event = json.loads(body.replace("'", '"'))
-        order_id = event.get("order_id")
-        warehouse_id = event.get("warehouse_id")
-
-        with engine.connect() as conn:
-            conn.execute(
-                text("""
-                    INSERT INTO orders (ext_order_id, warehouse_id, status)
-                    VALUES (:oid, :wid, 'created')
-                """),
-                {"oid": order_id, "wid": warehouse_id}
-            )
-            conn.commit()
-
-        logging.info(f"✅ Order {order_id} inserted successfully into MySQL")
+    orders, malformed = parse_order_events(msgs)
+
+    # 🧠 A body that can't be decoded never will be: dead-letter it now
+    for msg, error in malformed:
+        logging.error(f"❌ Dead-lettering malformed order event {msg.message_id}: {error}")
+        message_actions.deadletter(
+            msg, deadletter_reason="MalformedOrderEvent", deadletter_error_description=error[:1024],
+        )
+    if not orders:
+        return
 
+    # ✅ Whole batch in one statement and one transaction
+    try:
+        with engine.begin() as conn:
+            upsert_orders(conn, [row for row, _ in orders.values()])
     except Exception as e:
-        logging.error(f"❌ Error processing order: {str(e)}")
-        raise
+        logging.warning(f"⚠️ Batch insert failed, retrying orders one by one: {str(e)}")
+    else:
+        for _, messages in orders.values():
+            for msg in messages:
+                message_actions.complete(msg)
+        logging.info(f"✅ {len(orders)} orders inserted successfully into MySQL")
+        return
+
+    # 🧠 Isolate the bad rows so the good ones still land. A failed row goes
+    # back to the queue alone; Service Bus dead-letters it after
+    # maxDeliveryCount attempts, and a database outage only delays it.
+    stored = 0
+    for ext_order_id, (row, messages) in orders.items():
+        try:
+            with engine.begin() as conn:
+                upsert_orders(conn, [row])
+        except Exception as e:
+            logging.error(f"❌ Error processing order {ext_order_id}: {str(e)}")
+            for msg in messages:
+                message_actions.abandon(msg)
+            continue
+        stored += 1
+        for msg in messages:
+            message_actions.complete(msg)
+    logging.info(f"✅ {stored} of {len(orders)} orders inserted successfully into MySQL")
 
 
 # ==============================
 #   2️⃣ CONFIRM ORDER FUNCTION
 # ==============================
-class InvoicePDF(FPDF):
-    def header(self):
-        self.set_fill_color(44, 62, 80)
-        self.set_text_color(255, 255, 255)
-        self.set_font("Helvetica", "B", 16)
-        self.cell(0, 15, "SMART INVENTORY SOLUTIONS PVT. LTD.", 0, 1, "C", fill=True)
-        self.ln(4)
-
-    def footer(self):
-        self.set_y(-25)
-        self.set_draw_color(180, 180, 180)
-        self.line(10, self.get_y(), 200, self.get_y())
-        self.set_font("Helvetica", "I", 10)
-        self.set_text_color(100, 100, 100)
-        self.cell(0, 10, "Thank you for your business!", 0, 1, "C")
-        self.cell(0, 10, "Contact: support@smartinventory.com", 0, 0, "C")
+# fpdf is pure Python, so invoices render in worker processes; uploads are
+# I/O bound and run on threads with a cap on how many are in flight
+INVOICE_RENDER_WORKERS = int(os.getenv("INVOICE_RENDER_WORKERS", str(os.cpu_count() or 2)))
+INVOICE_UPLOAD_CONCURRENCY = int(os.getenv("INVOICE_UPLOAD_CONCURRENCY", "8"))
+# Blob metadata key holding invoice_hash() of the data the PDF was rendered from
+INVOICE_HASH_METADATA = "content_hash"
+
+_render_pool = None
+_upload_pool = None
+
+
+def get_invoice_pools():
+    """Pools are created on first use and reused by later invocations."""
+    global _render_pool, _upload_pool
+    if _render_pool is None:
+        # spawn: children import only invoice.py, not this module's clients
+        _render_pool = ProcessPoolExecutor(
+            max_workers=INVOICE_RENDER_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        _upload_pool = ThreadPoolExecutor(
+            max_workers=INVOICE_UPLOAD_CONCURRENCY,
+            thread_name_prefix="invoice-upload",
+        )
+    return _render_pool, _upload_pool
+
+
+# Every order in the batch and its items in one round trip. Orders are
+# matched on the id the process_order function stored them under; the API
+# wrote the items under its own order id, the one the event carries, which
+# is that same ext_order_id as a number.
+ORDERS_WITH_ITEMS_SQL = text("""
+    SELECT o.order_id, o.ext_order_id, o.warehouse_id, o.status, o.invoice_blob,
+           i.product_id, i.quantity, i.price
+    FROM orders o
+    LEFT JOIN order_items i ON i.order_id = CAST(o.ext_order_id AS UNSIGNED)
+    WHERE o.ext_order_id IN :oids
+    ORDER BY o.order_id, i.order_item_id
+""").bindparams(bindparam("oids", expanding=True))
+
+CONFIRM_ORDERS_SQL = text(
+    "UPDATE orders SET status='confirmed' WHERE ext_order_id IN :oids AND status <> 'confirmed'"
+).bindparams(bindparam("oids", expanding=True))
+
+
+def parse_confirmations(msgs):
+    """Distinct order ids in the batch; malformed messages are logged and skipped."""
+    order_ids = {}
+    for msg in msgs:
+        try:
+            event = decode_event(msg.get_body())
+            order_ids[str(event["order_id"])] = event["order_id"]
+        except Exception as e:
+            logging.error(f"❌ Skipping malformed confirmation event {msg.message_id}: {str(e)}")
+    return list(order_ids.values())
+
+
+def confirm_and_load(conn, order_ids):
+    """Mark the orders confirmed and return {str(order_id): (order, items)} for the event ids."""
+    ext_order_ids = [str(oid) for oid in order_ids]
+    conn.execute(CONFIRM_ORDERS_SQL, {"oids": ext_order_ids})
+    found = {}
+    for r in conn.execute(ORDERS_WITH_ITEMS_SQL, {"oids": ext_order_ids}).mappings():
+        key = str(r["ext_order_id"])
+        if key not in found:
+            found[key] = ({k: r[k] for k in ("order_id", "warehouse_id", "status", "invoice_blob")}, [])
+        # Left join: an order without items comes back as one row of NULLs
+        if r["product_id"] is not None:
+            found[key][1].append({"product_id": r["product_id"], "quantity": r["quantity"], "price": r["price"]})
+    return found
+
+
+def save_invoices(conn, urls):
+    """Write every invoice URL ({order_id: url}) in one UPDATE. Only confirmed
+    orders without an invoice take one, so redelivered messages and concurrent
+    duplicates never overwrite a finished invoice."""
+    stmt = (
+        update(orders_table)
+        .where(
+            orders_table.c.order_id.in_(list(urls)),
+            orders_table.c.status == "confirmed",
+            orders_table.c.invoice_blob.is_(None),
+        )
+        .values(invoice_blob=case(urls, value=orders_table.c.order_id))
+    )
+    return conn.execute(stmt).rowcount
+
+
+def find_current_invoice(order_id, content_hash):
+    """URL of the stored invoice if it was rendered from the same order data, else None."""
+    blob_client = get_blob_service_client().get_blob_client(container=container_name, blob=f"invoice_order_{order_id}.pdf")
+    try:
+        properties = blob_client.get_blob_properties()
+    except ResourceNotFoundError:
+        return None
+    if properties.metadata.get(INVOICE_HASH_METADATA) == content_hash:
+        return blob_client.url
+    return None
+
+
+def upload_invoice(order_id, pdf_data: bytes, content_hash: str) -> str:
+    blob_name = f"invoice_order_{order_id}.pdf"
+    blob_client = get_blob_service_client().get_blob_client(container=container_name, blob=blob_name)
+    blob_client.upload_blob(BytesIO(pdf_data), overwrite=True, metadata={INVOICE_HASH_METADATA: content_hash})
+    return blob_client.url
+
+
+def render_and_upload(pending, metrics: InvoiceMetrics):
+    """
+    Produce invoices for [(order_id, order, items)] as a pipeline: check the
+    stored blob's content hash, render in the process pool only if it changed,
+    then upload as soon as each PDF is ready. Returns {orders.order_id:
+    blob_url} for the ones that made it; failures are logged per order.
+    """
+    render_pool, upload_pool = get_invoice_pools()
+    stages = {}
+    for order_id, order, items in pending:
+        job = (order_id, order, items, invoice_hash(order_id, order["warehouse_id"], items))
+        stages[upload_pool.submit(find_current_invoice, order_id, job[3])] = ("check", job, None)
+
+    urls = {}
+    while stages:
+        done, _ = wait(stages, return_when=FIRST_COMPLETED)
+        for future in done:
+            stage, job, size = stages.pop(future)
+            order_id, order, items, content_hash = job
+            try:
+                result = future.result()
+            except Exception as e:
+                if stage == "check":
+                    # Could not read the stored invoice: render it anyway
+                    logging.warning(f"⚠️ Invoice lookup failed for order {order_id}: {str(e)}")
+                    result = None
+                else:
+                    logging.error(f"❌ Invoice {stage} failed for order {order_id}: {str(e)}")
+                    continue
+
+            if stage == "check":
+                if result:
+                    metrics.observe_skip()
+                    urls[order["order_id"]] = result
+                else:
+                    render = render_pool.submit(timed_render, order_id, order["warehouse_id"], items)
+                    stages[render] = ("render", job, None)
+            elif stage == "render":
+                pdf_data, seconds = result
+                metrics.observe_render(seconds)
+                upload = upload_pool.submit(upload_invoice, order_id, pdf_data, content_hash)
+                stages[upload] = ("upload", job, len(pdf_data))
+            else:
+                metrics.observe_upload(size)
+                urls[order["order_id"]] = result
+                logging.info(f"📎 Invoice URL for order {order_id}: {result}")
+    return urls
 
 
 @app.service_bus_queue_trigger(
-    arg_name="msg",
+    arg_name="msgs",
     queue_name="order-confirmation-queue",
     connection="SERVICE_BUS_CONNECTION_STRING",
+    cardinality=func.Cardinality.MANY,
 )
-def confirm_order(msg: func.ServiceBusMessage):
-    logging.info("🚚 Received order confirmation event")
+def confirm_order(msgs: List[func.ServiceBusMessage]):
+    logging.info(f"🚚 Received {len(msgs)} order confirmation events")
 
     try:
-        body = msg.get_body().decode("utf-8")
-        event = json.loads(body.replace("'", '"'))
-        order_id = event["order_id"]
-
-        # with engine.connect() as conn:
-        #     conn.execute(
-        #         text("UPDATE orders SET status='confirmed' WHERE order_id=:oid"),
-        #         {"oid": order_id},
-        #     )
-        #     order = conn.execute(
-        #         text("SELECT * FROM orders WHERE order_id=:oid"),
-        #         {"oid": order_id},
-        #     ).mappings().first()
-        #     items = conn.execute(
-        #         text("""
-        #             SELECT product_id, quantity, price
-        #             FROM order_items
-        #             WHERE order_id=:oid
-        #         """),
-        #         {"oid": order_id},
-        #     ).mappings().all()
-        #     total_amount = sum(
-        #         [float(i["quantity"]) * float(i["price"]) for i in items]
-        #     )
-        #     conn.commit()
-        with engine.connect() as conn:
-            # ✅ Update order status
-            conn.execute(
-                text("UPDATE orders SET status='confirmed' WHERE ext_order_id=:oid"),
-                {"oid": order_id},
-            )
-
-            # ✅ Fetch order details
-            order = conn.execute(
-                text("SELECT * FROM orders WHERE ext_order_id=:oid"),
-                {"oid": order_id},
-            ).mappings().first()
+        order_ids = parse_confirmations(msgs)
+        if not order_ids:
+            return
+
+        # ✅ Confirm and load every order with its items in one transaction
+        with engine.begin() as conn:
+            found = confirm_and_load(conn, order_ids)
 
+        pending = []
+        for order_id in order_ids:
             # 🧠 Safety check — handle missing order
-            if order is None:
+            if str(order_id) not in found:
                 logging.error(f"❌ No order found in DB for order_id={order_id}")
-                return
-
-            # ✅ Fetch order items
-            items = conn.execute(
-                text("""
-                    SELECT product_id, quantity, price
-                    FROM order_items
-                    WHERE order_id=:oid
-                """),
-                {"oid": order_id},
-            ).mappings().all()
+                continue
+            order, items = found[str(order_id)]
+
+            # 🧠 Redelivered message — invoice already generated
+            if order["invoice_blob"]:
+                logging.info(f"ℹ️ Order {order_id} already has an invoice, skipping")
+                continue
 
             # 🧠 Safety check — handle missing items
             if not items:
                 logging.warning(f"⚠️ No items found for order_id={order_id}")
-                total_amount = 0
-            else:
-                total_amount = sum(
-                    [float(i["quantity"]) * float(i["price"]) for i in items]
-                )
-
-            conn.commit()
-
-        # --- Generate PDF Invoice ---
-        pdf = InvoicePDF()
-        pdf.add_page()
-        pdf.set_font("Helvetica", "B", 14)
-        pdf.cell(0, 10, f"Invoice #: INV-{order_id:04}", 0, 1, "R")
-        pdf.set_font("Helvetica", "", 12)
-        pdf.cell(0, 8, f"Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", 0, 1, "R")
-        pdf.ln(5)
-        pdf.set_font("Helvetica", "B", 12)
-        pdf.cell(0, 10, "Invoice Details", 0, 1, "L")
-        pdf.set_font("Helvetica", "", 11)
-        pdf.cell(100, 8, f"Order ID: {order_id}", 0, 1)
-        pdf.cell(100, 8, f"Warehouse ID: {order['warehouse_id']}", 0, 1)
-        pdf.cell(100, 8, "Customer: Sumasri", 0, 1)
-        pdf.ln(8)
-
-        pdf.set_fill_color(41, 128, 185)
-        pdf.set_text_color(255, 255, 255)
-        pdf.set_font("Helvetica", "B", 12)
-        pdf.cell(50, 10, "Product ID", 1, 0, "C", True)
-        pdf.cell(40, 10, "Quantity", 1, 0, "C", True)
-        pdf.cell(50, 10, "Price (INR)", 1, 0, "C", True)
-        pdf.cell(50, 10, "Total (INR)", 1, 1, "C", True)
-
-        pdf.set_font("Helvetica", "", 11)
-        pdf.set_text_color(0, 0, 0)
-        fill = False
-        for item in items:
-            pdf.set_fill_color(245, 245, 245) if fill else pdf.set_fill_color(255, 255, 255)
-            pid, qty, price = item["product_id"], item["quantity"], item["price"]
-            line_total = float(qty) * float(price)
-            pdf.cell(50, 10, str(pid), 1, 0, "C", fill)
-            pdf.cell(40, 10, str(qty), 1, 0, "C", fill)
-            pdf.cell(50, 10, f"{price:.2f}", 1, 0, "C", fill)
-            pdf.cell(50, 10, f"INR {line_total:.2f}", 1, 1, "C", fill)
-            fill = not fill
-        pdf.set_font("Helvetica", "B", 12)
-        pdf.cell(140, 10, "Grand Total", 1, 0, "R", fill=False)
-        pdf.cell(50, 10, f"INR {total_amount:.2f}", 1, 1, "C", fill=False)
-
-        pdf_data = bytes(pdf.output(dest="S"))
-        pdf_stream = BytesIO(pdf_data)
-        pdf_stream.seek(0)
-
-        blob_name = f"invoice_order_{order_id}.pdf"
-        blob_client = blob_service_client.get_blob_client(container=container_name, blob=blob_name)
-        blob_client.upload_blob(pdf_stream, overwrite=True)
-        blob_url = blob_client.url
-
-        with engine.connect() as conn:
-            conn.execute(
-                text("UPDATE orders SET invoice_blob=:url WHERE order_id=:oid"),
-                {"url": blob_url, "oid": order_id},
-            )
-            conn.commit()
-
-        logging.info(f"✅ Order {order_id} confirmed, invoice generated, and uploaded.")
-        logging.info(f"📎 Invoice URL: {blob_url}")
+            pending.append((order_id, order, items))
+
+        metrics = InvoiceMetrics()
+        urls = render_and_upload(pending, metrics) if pending else {}
+        logging.info("📊 Invoice metrics", extra={"custom_dimensions": metrics.snapshot()})
+        if not urls:
+            return
+
+        # ✅ All invoice URLs in one guarded bulk UPDATE
+        with engine.begin() as conn:
+            saved = save_invoices(conn, urls)
+
+        logging.info(f"✅ {saved} of {len(pending)} orders confirmed, invoiced and uploaded.")
 
     except Exception as e:
         logging.error(f"❌ Error in order confirmation: {str(e)}")
@@ -0,0 +1,137 @@
+"""
+Invoice PDF rendering for the order confirmation function.
+
+Kept free of import-time side effects (no database engine, no blob client)
+so the render worker processes in function_app can import it cheaply.
+"""
+from datetime import datetime
+import hashlib
+import json
+import time
+from fpdf import FPDF, XPos, YPos
+
+# Bump whenever the rendered layout changes so stored invoices are redone
+LAYOUT_VERSION = 1
+
+
+class InvoicePDF(FPDF):
+    def header(self):
+        self.set_fill_color(44, 62, 80)
+        self.set_text_color(255, 255, 255)
+        self.set_font("Helvetica", "B", 16)
+        self.cell(0, 15, "SMART INVENTORY SOLUTIONS PVT. LTD.", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align="C", fill=True)
+        self.ln(4)
+
+    def footer(self):
+        self.set_y(-25)
+        self.set_draw_color(180, 180, 180)
+        self.line(10, self.get_y(), 200, self.get_y())
+        self.set_font("Helvetica", "I", 10)
+        self.set_text_color(100, 100, 100)
+        self.cell(0, 10, "Thank you for your business!", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align="C")
+        self.cell(0, 10, "Contact: support@smartinventory.com", align="C")
+
+
+def invoice_hash(order_id, warehouse_id, items) -> str:
+    """
+    Fingerprint of everything printed on the invoice except the render date.
+    It is stored as blob metadata, so a redelivered order whose data has not
+    changed skips both rendering and upload.
+    """
+    content = {
+        "layout": LAYOUT_VERSION,
+        "order_id": order_id,
+        "warehouse_id": warehouse_id,
+        "items": sorted(
+            [str(i["product_id"]), str(i["quantity"]), f"{float(i['price']):.2f}"] for i in items
+        ),
+    }
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()
+
+
+def invoice_total(items) -> float:
+    return sum(float(i["quantity"]) * float(i["price"]) for i in items)
+
+
+def render_invoice(order_id, warehouse_id, items) -> bytes:
+    """Render one invoice; runs in a worker process, so arguments are plain data."""
+    total_amount = invoice_total(items)
+
+    pdf = InvoicePDF()
+    pdf.add_page()
+    pdf.set_font("Helvetica", "B", 14)
+    pdf.cell(0, 10, f"Invoice #: INV-{order_id:04}", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align="R")
+    pdf.set_font("Helvetica", "", 12)
+    pdf.cell(0, 8, f"Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align="R")
+    pdf.ln(5)
+    pdf.set_font("Helvetica", "B", 12)
+    pdf.cell(0, 10, "Invoice Details", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align="L")
+    pdf.set_font("Helvetica", "", 11)
+    pdf.cell(100, 8, f"Order ID: {order_id}", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    pdf.cell(100, 8, f"Warehouse ID: {warehouse_id}", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    pdf.cell(100, 8, "Customer: Sumasri", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    pdf.ln(8)
+
+    pdf.set_fill_color(41, 128, 185)
+    pdf.set_text_color(255, 255, 255)
+    pdf.set_font("Helvetica", "B", 12)
+    pdf.cell(50, 10, "Product ID", border=1, align="C", fill=True)
+    pdf.cell(40, 10, "Quantity", border=1, align="C", fill=True)
+    pdf.cell(50, 10, "Price (INR)", border=1, align="C", fill=True)
+    pdf.cell(50, 10, "Total (INR)", border=1, new_x=XPos.LMARGIN, new_y=YPos.NEXT, align="C", fill=True)
+
+    pdf.set_font("Helvetica", "", 11)
+    pdf.set_text_color(0, 0, 0)
+    fill = False
+    for item in items:
+        pdf.set_fill_color(245, 245, 245) if fill else pdf.set_fill_color(255, 255, 255)
+        pid, qty, price = item["product_id"], item["quantity"], item["price"]
+        line_total = float(qty) * float(price)
+        pdf.cell(50, 10, str(pid), border=1, align="C", fill=fill)
+        pdf.cell(40, 10, str(qty), border=1, align="C", fill=fill)
+        pdf.cell(50, 10, f"{price:.2f}", border=1, align="C", fill=fill)
+        pdf.cell(50, 10, f"INR {line_total:.2f}", border=1, new_x=XPos.LMARGIN, new_y=YPos.NEXT, align="C", fill=fill)
+        fill = not fill
+    pdf.set_font("Helvetica", "B", 12)
+    pdf.cell(140, 10, "Grand Total", border=1, align="R", fill=False)
+    pdf.cell(50, 10, f"INR {total_amount:.2f}", border=1, new_x=XPos.LMARGIN, new_y=YPos.NEXT, align="C", fill=False)
+
+    return bytes(pdf.output(dest="S"))
+
+
+def timed_render(order_id, warehouse_id, items):
+    """render_invoice for the process pool: (pdf bytes, seconds spent rendering)."""
+    start = time.perf_counter()
+    pdf_data = render_invoice(order_id, warehouse_id, items)
+    return pdf_data, time.perf_counter() - start
+
+
+class InvoiceMetrics:
+    """Render and upload counters for one confirmation batch."""
+
+    def __init__(self):
+        self.rendered = 0
+        self.render_seconds = 0.0
+        self.skipped_unchanged = 0
+        self.uploaded = 0
+        self.bytes_uploaded = 0
+
+    def observe_render(self, seconds: float):
+        self.rendered += 1
+        self.render_seconds += seconds
+
+    def observe_skip(self):
+        self.skipped_unchanged += 1
+
+    def observe_upload(self, size: int):
+        self.uploaded += 1
+        self.bytes_uploaded += size
+
+    def snapshot(self) -> dict:
+        return {
+            "invoices_rendered": self.rendered,
+            "invoice_render_seconds": round(self.render_seconds, 4),
+            "invoices_skipped_unchanged": self.skipped_unchanged,
+            "invoices_uploaded": self.uploaded,
+            "invoice_bytes_uploaded": self.bytes_uploaded,
+        }